@@ -0,0 +1,208 @@
+# QR Attendance System - Backend Microbenchmarks
+# Times the API hot paths against seeded SQLite databases and compares with a saved baseline
+
+import argparse
+import json
+import os
+import platform
+import statistics
+import sys
+import tempfile
+import time
+from datetime import date, datetime, timedelta
+
+# Configuration
+BASELINE_FILE = "benchmark_baseline.json"
+DEFAULT_SIZES = "1000,10000,100000"
+SEEDED_EVENT = "Benchmark Event"
+SCAN_EVENT = "Benchmark Scan Event"
+SECTIONS = 10
+
+# A benchmark regresses when it runs more SQL statements than the baseline, or when its
+# median latency is both TOLERANCE slower and NOISE_MS slower than the baseline
+DEFAULT_TOLERANCE = 0.25
+NOISE_MS = 0.5
+
+def load_backend(database):
+    """Import the backend against a SQLite file (DATABASE_URL is read at import time)"""
+    os.environ["DATABASE_URL"] = f"sqlite:///{database}"
+    sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+    import backend.main as backend
+    backend.migrate_schema(backend.engine)
+    return backend
+
+class QueryCounter:
+    """Counts SQL statements sent through the backend engine"""
+
+    def __init__(self, engine):
+        self.count = 0
+        from sqlalchemy import event
+        event.listen(engine, "before_cursor_execute", self._on_execute)
+
+    def _on_execute(self, *args):
+        self.count += 1
+
+def seed_database(backend, students):
+    """Replace all data with `students` students, one seeded event holding a record per student, and an admin user"""
+    db = backend.SessionLocal()
+    try:
+        for table in reversed(backend.Base.metadata.sorted_tables):
+            if table is not backend.SchemaVersion.__table__:
+                db.execute(table.delete())
+        db.commit()
+
+        now = datetime.utcnow()
+        db.add(backend.User(Username="admin", PasswordHash=backend.hash_password("admin123"), FullName="Benchmark", Role="admin"))
+        event = backend.Event(EventName=SEEDED_EVENT)
+        db.add(event)
+        db.add(backend.Event(EventName=SCAN_EVENT))
+        db.flush()
+
+        chunk = 10000
+        for start in range(0, students, chunk):
+            numbers = range(start, min(start + chunk, students))
+            db.bulk_insert_mappings(backend.Student, [
+                {"StudentID": f"B{number:06d}", "StudentName": f"Student {number}", "Section": f"Section {number % SECTIONS}",
+                 "CreatedAt": now, "UpdatedAt": now, "IsActive": True}
+                for number in numbers
+            ])
+            db.bulk_insert_mappings(backend.AttendanceRecord, [
+                {"StudentID": f"B{number:06d}", "EventID": event.EventID, "AttendanceDate": date(2024, 1, 1),
+                 "TimeIn": datetime(2024, 1, 1, 8) + timedelta(seconds=number), "TimeOut": None,
+                 "CheckInMs": None, "LastUpdateMs": None, "CreatedAt": now, "UpdatedAt": now}
+                for number in numbers
+            ])
+        db.commit()
+        backend.rebuild_attendance_summary(db)
+        db.commit()
+    finally:
+        db.close()
+    backend.roster_cache.clear()
+    backend.api_key_cache.clear()
+
+def measure(client, counter, request, iterations, warmup, before=None):
+    """Run request(i) `iterations` times after `warmup` untimed calls; returns latency and query-count stats"""
+    for i in range(warmup):
+        if before:
+            before()
+        request(i)
+    latencies, queries = [], []
+    for i in range(warmup, warmup + iterations):
+        if before:
+            before()
+        counter.count = 0
+        started = time.perf_counter()
+        response = request(i)
+        latencies.append(time.perf_counter() - started)
+        queries.append(counter.count)
+        if response.status_code != 200:
+            raise RuntimeError(f"{response.request.method} {response.request.url.path} returned {response.status_code}: {response.text[:200]}")
+    latencies.sort()
+    return {
+        "median_ms": statistics.median(latencies) * 1000,
+        "p95_ms": latencies[max(0, int(round(0.95 * len(latencies))) - 1)] * 1000,
+        "min_ms": latencies[0] * 1000,
+        "queries": statistics.median(queries),
+    }
+
+def run_benchmarks(backend, client, counter, students, iterations, warmup):
+    """All benchmarks for one dataset size; returns {benchmark name: stats}"""
+    response = client.post("/auth/login", json={"username": "admin", "password": "admin123"})
+    headers = {"Authorization": f"Bearer {response.json()['access_token']}"}
+    # Each scan uses a different student, so check-ins always insert and check-outs always update
+    scanned = lambda i: f"B{(i * 7919) % students:06d}"
+    now = datetime.utcnow().isoformat() + "Z"
+
+    benchmarks = [
+        ("get_current_user (cached key)", lambda i: client.get("/cache/stats", headers=headers), None),
+        ("get_current_user (uncached key)", lambda i: client.get("/cache/stats", headers=headers), backend.api_key_cache.clear),
+        ("mark_attendance (check-in)", lambda i: client.post("/attendance/mark", headers=headers,
+                                                             json={"student_id": scanned(i), "event_name": SCAN_EVENT, "time_in": now}), None),
+        ("mark_attendance (check-out)", lambda i: client.post("/attendance/mark", headers=headers,
+                                                              json={"student_id": scanned(i), "event_name": SCAN_EVENT, "time_out": now}), None),
+        ("get_attendance_by_event", lambda i: client.get(f"/attendance/event/{SEEDED_EVENT}", headers=headers), None),
+        ("get_students", lambda i: client.get("/students", headers=headers), None),
+    ]
+    results = {}
+    for name, request, before in benchmarks:
+        results[name] = measure(client, counter, request, iterations, warmup, before)
+        row = results[name]
+        print(f"   {name:<34} median {row['median_ms']:8.2f} ms   p95 {row['p95_ms']:8.2f} ms   "
+              f"min {row['min_ms']:8.2f} ms   {row['queries']:g} queries")
+    return results
+
+def compare(results, baseline, tolerance):
+    """List the benchmarks that regressed against the baseline"""
+    regressions = []
+    for size, benchmarks in results.items():
+        for name, row in benchmarks.items():
+            base = baseline.get("results", {}).get(size, {}).get(name)
+            if base is None:
+                continue
+            if row["queries"] > base["queries"]:
+                regressions.append(f"{size} students / {name}: {row['queries']:g} queries (baseline {base['queries']:g})")
+            slower = row["median_ms"] - base["median_ms"]
+            if slower > NOISE_MS and row["median_ms"] > base["median_ms"] * (1 + tolerance):
+                regressions.append(f"{size} students / {name}: median {row['median_ms']:.2f} ms "
+                                   f"(baseline {base['median_ms']:.2f} ms, +{slower / base['median_ms']:.0%})")
+    return regressions
+
+def build_parser():
+    parser = argparse.ArgumentParser(description="QR Attendance System - Backend Microbenchmarks")
+    parser.add_argument("--sizes", default=DEFAULT_SIZES, help=f"student counts to seed (default: {DEFAULT_SIZES})")
+    parser.add_argument("--iterations", type=int, default=200, help="timed requests per benchmark (default: 200)")
+    parser.add_argument("--warmup", type=int, default=20, help="untimed requests before each benchmark (default: 20)")
+    parser.add_argument("--baseline", default=BASELINE_FILE, help=f"baseline file (default: {BASELINE_FILE})")
+    parser.add_argument("--save", action="store_true", help="write these results as the new baseline")
+    parser.add_argument("--tolerance", type=float, default=DEFAULT_TOLERANCE,
+                        help=f"allowed median slowdown before failing, as a fraction (default: {DEFAULT_TOLERANCE})")
+    return parser
+
+def main():
+    """Seed each dataset size, run the benchmarks and compare with (or save) the baseline"""
+    args = build_parser().parse_args()
+    sizes = [int(size) for size in args.sizes.split(",")]
+
+    print("QR Attendance System - Backend Microbenchmarks")
+    print("==============================================")
+    database = os.path.join(tempfile.mkdtemp(prefix="qr_bench_"), "benchmark.db")
+    backend = load_backend(database)
+    from fastapi.testclient import TestClient
+
+    counter = QueryCounter(backend.engine)
+    results = {}
+    with TestClient(backend.app) as client:
+        for students in sizes:
+            print(f"\n📊 {students} students (seeding...)")
+            seed_database(backend, students)
+            results[str(students)] = run_benchmarks(backend, client, counter, students, args.iterations, args.warmup)
+
+    if args.save:
+        with open(args.baseline, "w", encoding="utf-8") as f:
+            json.dump({
+                "saved_at": datetime.now().isoformat(),
+                "python": platform.python_version(),
+                "platform": platform.platform(),
+                "iterations": args.iterations,
+                "results": results,
+            }, f, indent=2)
+        print(f"\n✅ Baseline saved to {args.baseline}")
+        return 0
+
+    if not os.path.exists(args.baseline):
+        print(f"\nℹ️  No baseline at {args.baseline}; run with --save to create one")
+        return 0
+
+    with open(args.baseline, "r", encoding="utf-8") as f:
+        baseline = json.load(f)
+    regressions = compare(results, baseline, args.tolerance)
+    if regressions:
+        print(f"\n❌ {len(regressions)} regression(s) against {args.baseline} (saved {baseline.get('saved_at', 'unknown')}):")
+        for regression in regressions:
+            print(f"   - {regression}")
+        return 1
+    print(f"\n✅ No regressions against {args.baseline} (saved {baseline.get('saved_at', 'unknown')})")
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -10,8 +10,8 @@ CREATE TABLE Students (
     StudentID NVARCHAR(50) PRIMARY KEY,
     StudentName NVARCHAR(255) NOT NULL,
     Section NVARCHAR(100) NOT NULL,
-    CreatedAt DATETIME2 DEFAULT GETDATE(),
-    UpdatedAt DATETIME2 DEFAULT GETDATE(),
+    CreatedAt DATETIME2 DEFAULT SYSUTCDATETIME(),
+    UpdatedAt DATETIME2 DEFAULT SYSUTCDATETIME(),
     IsActive BIT DEFAULT 1
 );
 
@@ -20,8 +20,8 @@ CREATE TABLE Events (
     EventID INT IDENTITY(1,1) PRIMARY KEY,
     EventName NVARCHAR(255) NOT NULL UNIQUE,
     EventDescription NVARCHAR(500),
-    CreatedAt DATETIME2 DEFAULT GETDATE(),
-    UpdatedAt DATETIME2 DEFAULT GETDATE(),
+    CreatedAt DATETIME2 DEFAULT SYSUTCDATETIME(),
+    UpdatedAt DATETIME2 DEFAULT SYSUTCDATETIME(),
     IsActive BIT DEFAULT 1
 );
 
@@ -35,8 +35,8 @@ CREATE TABLE AttendanceRecords (
     TimeOut DATETIME2,
     CheckInMs BIGINT, -- For sorting purposes
     LastUpdateMs BIGINT, -- For sorting purposes
-    CreatedAt DATETIME2 DEFAULT GETDATE(),
-    UpdatedAt DATETIME2 DEFAULT GETDATE(),
+    CreatedAt DATETIME2 DEFAULT SYSUTCDATETIME(),
+    UpdatedAt DATETIME2 DEFAULT SYSUTCDATETIME(),
     FOREIGN KEY (StudentID) REFERENCES Students(StudentID),
     FOREIGN KEY (EventID) REFERENCES Events(EventID),
     UNIQUE(StudentID, EventID, AttendanceDate) -- One record per student per event per day
@@ -48,6 +48,23 @@ CREATE INDEX IX_AttendanceRecords_EventID ON AttendanceRecords(EventID);
 CREATE INDEX IX_AttendanceRecords_Date ON AttendanceRecords(AttendanceDate);
 CREATE INDEX IX_AttendanceRecords_StudentEventDate ON AttendanceRecords(StudentID, EventID, AttendanceDate);
 
+-- Create attendance summary table (per event/day/section totals, kept current by every scan;
+-- rebuild with: python db_tools.py rebuild-summary). Scans only add deltas, so when this table is
+-- created on a database that already has attendance, fill it first: python db_tools.py rebuild-summary
+CREATE TABLE AttendanceDailySummary (
+    EventID INT NOT NULL,
+    AttendanceDate DATE NOT NULL,
+    Section NVARCHAR(100) NOT NULL,
+    CheckedIn INT NOT NULL DEFAULT 0,
+    CheckedOut INT NOT NULL DEFAULT 0,
+    StillInside INT NOT NULL DEFAULT 0,
+    DurationCount INT NOT NULL DEFAULT 0, -- Records with both TimeIn and TimeOut
+    DurationTotalMinutes BIGINT NOT NULL DEFAULT 0,
+    UpdatedAt DATETIME2 DEFAULT SYSUTCDATETIME(),
+    PRIMARY KEY (EventID, AttendanceDate, Section),
+    FOREIGN KEY (EventID) REFERENCES Events(EventID)
+);
+
 -- Create Users table for authentication (for Android app)
 CREATE TABLE Users (
     UserID INT IDENTITY(1,1) PRIMARY KEY,
@@ -55,8 +72,8 @@ CREATE TABLE Users (
     PasswordHash NVARCHAR(255) NOT NULL,
     FullName NVARCHAR(255),
     Role NVARCHAR(50) DEFAULT 'admin', -- admin, teacher, student
-    CreatedAt DATETIME2 DEFAULT GETDATE(),
-    UpdatedAt DATETIME2 DEFAULT GETDATE(),
+    CreatedAt DATETIME2 DEFAULT SYSUTCDATETIME(),
+    UpdatedAt DATETIME2 DEFAULT SYSUTCDATETIME(),
     IsActive BIT DEFAULT 1
 );
 
@@ -66,12 +83,23 @@ CREATE TABLE APIKeys (
     UserID INT NOT NULL,
     APIKey NVARCHAR(255) NOT NULL UNIQUE,
     KeyName NVARCHAR(100),
-    CreatedAt DATETIME2 DEFAULT GETDATE(),
+    CreatedAt DATETIME2 DEFAULT SYSUTCDATETIME(),
     ExpiresAt DATETIME2,
     IsActive BIT DEFAULT 1,
     FOREIGN KEY (UserID) REFERENCES Users(UserID)
 );
 
+-- Create SchemaVersion table (checked by the API at startup; keep in sync with SCHEMA_VERSION in backend/main.py)
+CREATE TABLE SchemaVersion (
+    Version INT PRIMARY KEY,
+    Description NVARCHAR(255),
+    AppliedAt DATETIME2 DEFAULT SYSUTCDATETIME()
+);
+
+INSERT INTO SchemaVersion (Version, Description)
+VALUES (1, 'Students, Events, AttendanceRecords, AttendanceDailySummary, Users, APIKeys'),
+       (2, 'UTC timestamps from SQL Server defaults and procedures (SYSUTCDATETIME)');
+
 -- Insert default admin user
 INSERT INTO Users (Username, PasswordHash, FullName, Role) 
 VALUES ('admin', 'admin123', 'System Administrator', 'admin');
@@ -113,8 +141,8 @@ BEGIN
     SET NOCOUNT ON;
     
     -- Set default values
-    IF @AttendanceDate IS NULL SET @AttendanceDate = CAST(GETDATE() AS DATE);
-    IF @TimeIn IS NULL SET @TimeIn = GETDATE();
+    IF @AttendanceDate IS NULL SET @AttendanceDate = CAST(SYSDATETIME() AS DATE);
+    IF @TimeIn IS NULL SET @TimeIn = SYSUTCDATETIME();
     
     -- Get EventID
     DECLARE @EventID INT;
@@ -134,35 +162,57 @@ BEGIN
         RETURN;
     END
     
-    -- Check if record exists
-    IF EXISTS (SELECT 1 FROM AttendanceRecords WHERE StudentID = @StudentID AND EventID = @EventID AND AttendanceDate = @AttendanceDate)
-    BEGIN
-        -- Update existing record
-        IF @TimeOut IS NOT NULL
-        BEGIN
-            UPDATE AttendanceRecords 
-            SET TimeOut = @TimeOut, 
-                LastUpdateMs = DATEDIFF_BIG(MILLISECOND, '1970-01-01', GETDATE()),
-                UpdatedAt = GETDATE()
-            WHERE StudentID = @StudentID AND EventID = @EventID AND AttendanceDate = @AttendanceDate;
-        END
-        ELSE
-        BEGIN
-            UPDATE AttendanceRecords 
-            SET TimeIn = @TimeIn,
-                LastUpdateMs = DATEDIFF_BIG(MILLISECOND, '1970-01-01', GETDATE()),
-                UpdatedAt = GETDATE()
-            WHERE StudentID = @StudentID AND EventID = @EventID AND AttendanceDate = @AttendanceDate;
-        END
-    END
-    ELSE
-    BEGIN
-        -- Insert new record
-        INSERT INTO AttendanceRecords (StudentID, EventID, AttendanceDate, TimeIn, TimeOut, CheckInMs, LastUpdateMs)
-        VALUES (@StudentID, @EventID, @AttendanceDate, @TimeIn, @TimeOut, 
-                DATEDIFF_BIG(MILLISECOND, '1970-01-01', GETDATE()),
-                DATEDIFF_BIG(MILLISECOND, '1970-01-01', GETDATE()));
-    END
+    -- Insert or update the record in one statement; HOLDLOCK prevents two
+    -- scanners from inserting the same student/event/day concurrently
+    DECLARE @Changes TABLE (PreviousTimeIn DATETIME2, PreviousTimeOut DATETIME2, TimeIn DATETIME2, TimeOut DATETIME2);
+    
+    MERGE AttendanceRecords WITH (HOLDLOCK) AS target
+    USING (SELECT @StudentID AS StudentID, @EventID AS EventID, @AttendanceDate AS AttendanceDate) AS source
+    ON target.StudentID = source.StudentID
+       AND target.EventID = source.EventID
+       AND target.AttendanceDate = source.AttendanceDate
+    WHEN MATCHED THEN
+        UPDATE SET TimeIn = CASE WHEN @TimeOut IS NULL THEN @TimeIn ELSE target.TimeIn END,
+                   TimeOut = COALESCE(@TimeOut, target.TimeOut),
+                   LastUpdateMs = DATEDIFF_BIG(MILLISECOND, '1970-01-01', SYSUTCDATETIME()),
+                   UpdatedAt = SYSUTCDATETIME()
+    WHEN NOT MATCHED THEN
+        INSERT (StudentID, EventID, AttendanceDate, TimeIn, TimeOut, CheckInMs, LastUpdateMs)
+        VALUES (@StudentID, @EventID, @AttendanceDate, @TimeIn, @TimeOut,
+                DATEDIFF_BIG(MILLISECOND, '1970-01-01', SYSUTCDATETIME()),
+                DATEDIFF_BIG(MILLISECOND, '1970-01-01', SYSUTCDATETIME()))
+    OUTPUT deleted.TimeIn, deleted.TimeOut, inserted.TimeIn, inserted.TimeOut INTO @Changes;
+    
+    -- Apply the same change to the event/day/section totals
+    MERGE AttendanceDailySummary WITH (HOLDLOCK) AS target
+    USING (
+        SELECT @EventID AS EventID, @AttendanceDate AS AttendanceDate, s.Section,
+               IIF(c.TimeIn IS NOT NULL, 1, 0) - IIF(c.PreviousTimeIn IS NOT NULL, 1, 0) AS CheckedIn,
+               IIF(c.TimeOut IS NOT NULL, 1, 0) - IIF(c.PreviousTimeOut IS NOT NULL, 1, 0) AS CheckedOut,
+               IIF(c.TimeIn IS NOT NULL AND c.TimeOut IS NULL, 1, 0)
+                 - IIF(c.PreviousTimeIn IS NOT NULL AND c.PreviousTimeOut IS NULL, 1, 0) AS StillInside,
+               IIF(c.TimeIn IS NOT NULL AND c.TimeOut IS NOT NULL, 1, 0)
+                 - IIF(c.PreviousTimeIn IS NOT NULL AND c.PreviousTimeOut IS NOT NULL, 1, 0) AS DurationCount,
+               ISNULL(DATEDIFF(MINUTE, c.TimeIn, c.TimeOut), 0)
+                 - ISNULL(DATEDIFF(MINUTE, c.PreviousTimeIn, c.PreviousTimeOut), 0) AS DurationTotalMinutes
+        FROM @Changes c
+        CROSS JOIN Students s
+        WHERE s.StudentID = @StudentID
+    ) AS source
+    ON target.EventID = source.EventID
+       AND target.AttendanceDate = source.AttendanceDate
+       AND target.Section = source.Section
+    WHEN MATCHED THEN
+        UPDATE SET CheckedIn = target.CheckedIn + source.CheckedIn,
+                   CheckedOut = target.CheckedOut + source.CheckedOut,
+                   StillInside = target.StillInside + source.StillInside,
+                   DurationCount = target.DurationCount + source.DurationCount,
+                   DurationTotalMinutes = target.DurationTotalMinutes + source.DurationTotalMinutes,
+                   UpdatedAt = SYSUTCDATETIME()
+    WHEN NOT MATCHED THEN
+        INSERT (EventID, AttendanceDate, Section, CheckedIn, CheckedOut, StillInside, DurationCount, DurationTotalMinutes)
+        VALUES (source.EventID, source.AttendanceDate, source.Section, source.CheckedIn, source.CheckedOut,
+                source.StillInside, source.DurationCount, source.DurationTotalMinutes);
     
     -- Return the record
     SELECT * FROM vw_AttendanceSummary 
@@ -177,7 +227,7 @@ AS
 BEGIN
     SET NOCOUNT ON;
     
-    IF @AttendanceDate IS NULL SET @AttendanceDate = CAST(GETDATE() AS DATE);
+    IF @AttendanceDate IS NULL SET @AttendanceDate = CAST(SYSDATETIME() AS DATE);
     
     SELECT * FROM vw_AttendanceSummary 
     WHERE EventName = @EventName 
@@ -204,6 +254,7 @@ END;
 -- GRANT SELECT, INSERT, UPDATE, DELETE ON Students TO [YourAppUser];
 -- GRANT SELECT, INSERT, UPDATE, DELETE ON Events TO [YourAppUser];
 -- GRANT SELECT, INSERT, UPDATE, DELETE ON AttendanceRecords TO [YourAppUser];
+-- GRANT SELECT, INSERT, UPDATE, DELETE ON AttendanceDailySummary TO [YourAppUser];
 -- GRANT EXECUTE ON sp_MarkAttendance TO [YourAppUser];
 -- GRANT EXECUTE ON sp_GetAttendanceByEvent TO [YourAppUser];
 -- GRANT EXECUTE ON sp_GetStudentsBySection TO [YourAppUser];
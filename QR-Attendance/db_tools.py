@@ -0,0 +1,89 @@
+# QR Attendance System - Database Maintenance Tools
+# Apply schema migrations, and rebuild and verify the AttendanceDailySummary table
+
+import argparse
+import sys
+from backend.main import (engine, SessionLocal, SCHEMA_VERSION, SCHEMA_MIGRATIONS, read_schema_version, migrate_schema,
+                          check_schema, rebuild_attendance_summary, check_attendance_summary)
+
+def migrate():
+    """Bring the database schema up to the version this code expects"""
+    before, after = migrate_schema(engine)
+    if before == after:
+        print(f"Database schema is up to date (version {after})")
+    elif before is None:
+        print(f"Created missing tables and stamped the database as schema version {after}")
+    else:
+        print(f"Migrated database schema from version {before} to {after}")
+    return 0
+
+def schema_version():
+    """Report the database schema version and any pending migrations"""
+    version = read_schema_version(engine)
+    print(f"Database schema version: {version if version is not None else 'none (not versioned yet)'}")
+    print(f"Code schema version:     {SCHEMA_VERSION}")
+    pending = [(number, description) for number, description, _ in SCHEMA_MIGRATIONS if version is None or number > version]
+    if not pending:
+        return 0
+    for number, description in pending:
+        print(f"   pending {number}: {description}")
+    print("Run 'python db_tools.py migrate' to apply them")
+    return 1
+
+def rebuild_summary(db_session):
+    """Recompute AttendanceDailySummary from AttendanceRecords"""
+    print("Rebuilding attendance summary...")
+    rows = rebuild_attendance_summary(db_session)
+    db_session.commit()
+    print(f"Attendance summary rebuilt: {rows} event/date/section rows")
+    return 0
+
+def check_summary(db_session):
+    """Compare AttendanceDailySummary with vw_AttendanceSummary"""
+    print("Checking attendance summary against vw_AttendanceSummary...")
+    mismatches = check_attendance_summary(db_session)
+    if not mismatches:
+        print("Attendance summary is consistent")
+        return 0
+    
+    for mismatch in mismatches:
+        print(f"{mismatch['EventName']} / {mismatch['AttendanceDate']} / {mismatch['Section']}:")
+        print(f"   expected {mismatch['expected']}")
+        print(f"   found    {mismatch['actual']}")
+    print(f"{len(mismatches)} summary rows differ; run 'python db_tools.py rebuild-summary' to fix them")
+    return 1
+
+def main():
+    parser = argparse.ArgumentParser(description="QR Attendance System - Database Maintenance Tools")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+    subparsers.add_parser("migrate", help="Apply pending schema migrations (creates the tables on a new database)")
+    subparsers.add_parser("schema-version", help="Show the database schema version and pending migrations")
+    subparsers.add_parser("rebuild-summary", help="Recompute the attendance summary table from AttendanceRecords")
+    subparsers.add_parser("check-summary", help="Report summary rows that differ from vw_AttendanceSummary")
+    args = parser.parse_args()
+    
+    schema_commands = {
+        "migrate": migrate,
+        "schema-version": schema_version,
+    }
+    if args.command in schema_commands:
+        return schema_commands[args.command]()
+    
+    commands = {
+        "rebuild-summary": rebuild_summary,
+        "check-summary": check_summary,
+    }
+    
+    try:
+        check_schema(engine, auto_migrate=False)
+    except RuntimeError as e:
+        print(e)
+        return 1
+    db_session = SessionLocal()
+    try:
+        return commands[args.command](db_session)
+    finally:
+        db_session.close()
+
+if __name__ == "__main__":
+    sys.exit(main())
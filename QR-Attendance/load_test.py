@@ -0,0 +1,265 @@
+# QR Attendance System - API Load Test
+# Runs the test_api.py scenarios from many concurrent scanners and reports latency per endpoint
+
+import argparse
+import asyncio
+import json
+import os
+import random
+import sys
+import tempfile
+import time
+from datetime import datetime
+
+import httpx
+
+# Configuration
+BASE_URL = "http://localhost:8000"
+USERNAME = "admin"
+PASSWORD = "admin123"
+EVENT_NAME = "Load Test Event"
+STUDENT_PREFIX = "LOAD"
+
+# Scan mix: operation -> relative weight
+DEFAULT_MIX = "in=60,out=30,list=10"
+OPERATIONS = ("in", "out", "list", "login")
+
+def percentile(sorted_values, fraction):
+    """Nearest-rank percentile of an already sorted list"""
+    if not sorted_values:
+        return 0.0
+    index = max(0, min(len(sorted_values) - 1, int(round(fraction * len(sorted_values))) - 1))
+    return sorted_values[index]
+
+class EndpointStats:
+    """Latencies and failures for one endpoint"""
+
+    def __init__(self):
+        self.latencies = []
+        self.errors = 0
+        self.statuses = {}
+
+    def record(self, elapsed, status):
+        self.latencies.append(elapsed)
+        self.statuses[status] = self.statuses.get(status, 0) + 1
+        if not 200 <= status < 400:
+            self.errors += 1
+
+    def summary(self, duration):
+        values = sorted(self.latencies)
+        return {
+            "requests": len(values),
+            "errors": self.errors,
+            "rps": len(values) / duration if duration else 0.0,
+            "p50_ms": percentile(values, 0.50) * 1000,
+            "p95_ms": percentile(values, 0.95) * 1000,
+            "p99_ms": percentile(values, 0.99) * 1000,
+            "max_ms": (values[-1] if values else 0.0) * 1000,
+            "statuses": {str(code): count for code, count in sorted(self.statuses.items())},
+        }
+
+class LoadTest:
+    """Shared client, API key and per-endpoint statistics for one run"""
+
+    def __init__(self, client, args):
+        self.client = client
+        self.args = args
+        self.api_key = None
+        self.stats = {}
+        self.student_ids = [f"{STUDENT_PREFIX}{number:05d}" for number in range(args.students)]
+
+    @property
+    def headers(self):
+        return {"Authorization": f"Bearer {self.api_key}"}
+
+    async def request(self, endpoint, method, url, **kwargs):
+        """Send one request and record its latency under `endpoint`; transport errors count as status 0"""
+        started = time.perf_counter()
+        try:
+            response = await self.client.request(method, url, **kwargs)
+            status = response.status_code
+        except httpx.HTTPError:
+            response, status = None, 0
+        self.stats.setdefault(endpoint, EndpointStats()).record(time.perf_counter() - started, status)
+        return response
+
+    async def login(self):
+        response = await self.request("POST /auth/login", "POST", "/auth/login",
+                                      json={"username": self.args.username, "password": self.args.password})
+        if response is not None and response.status_code == 200:
+            self.api_key = response.json()["access_token"]
+        return response
+
+    async def setup(self, register):
+        """Log in (registering the user on a fresh in-process database) and create the event and students"""
+        response = await self.login()
+        if register and response is not None and response.status_code == 401:
+            await self.request("POST /auth/register", "POST", "/auth/register",
+                               json={"username": self.args.username, "password": self.args.password,
+                                     "full_name": "Load Test"})
+            response = await self.login()
+        if self.api_key is None:
+            raise RuntimeError(f"login failed: {response.status_code if response is not None else 'no response'}")
+
+        # 400 means the event/student is left over from an earlier run, which is fine
+        await self.request("POST /events", "POST", "/events", headers=self.headers,
+                           json={"EventName": self.args.event, "EventDescription": "Created by load_test.py"})
+        semaphore = asyncio.Semaphore(self.args.concurrency)
+
+        async def create_student(student_id):
+            async with semaphore:
+                await self.request("POST /students", "POST", "/students", headers=self.headers,
+                                   json={"StudentID": student_id, "StudentName": f"Load Student {student_id}",
+                                         "Section": f"Section {int(student_id[len(STUDENT_PREFIX):]) % 10}"})
+
+        await asyncio.gather(*(create_student(student_id) for student_id in self.student_ids))
+
+    async def scan(self, operation, rng):
+        """Run one operation of the scan mix"""
+        if operation == "login":
+            await self.login()
+            return
+        if operation == "list":
+            await self.request("GET /attendance/event/{event_name}", "GET",
+                               f"/attendance/event/{self.args.event}", headers=self.headers)
+            return
+        scan = {"student_id": rng.choice(self.student_ids), "event_name": self.args.event,
+                ("time_in" if operation == "in" else "time_out"): datetime.utcnow().isoformat() + "Z"}
+        await self.request(f"POST /attendance/mark ({operation})", "POST", "/attendance/mark",
+                           headers=self.headers, json=scan)
+
+    async def scanner(self, number, deadline, mix):
+        """One simulated scanner: picks operations from the mix until the deadline"""
+        rng = random.Random(self.args.seed + number)
+        operations, weights = zip(*mix.items())
+        while time.perf_counter() < deadline:
+            await self.scan(rng.choices(operations, weights)[0], rng)
+
+    async def run(self, mix):
+        """Start all scanners at once; returns the measured duration in seconds"""
+        self.stats = {}
+        started = time.perf_counter()
+        deadline = started + self.args.duration
+        await asyncio.gather(*(self.scanner(number, deadline, mix) for number in range(self.args.concurrency)))
+        return time.perf_counter() - started
+
+def parse_mix(value):
+    """'in=60,out=30,list=10' -> {'in': 60.0, 'out': 30.0, 'list': 10.0}"""
+    mix = {}
+    for part in value.split(","):
+        operation, _, weight = part.partition("=")
+        operation = operation.strip()
+        if operation not in OPERATIONS:
+            raise argparse.ArgumentTypeError(f"unknown operation '{operation}' (choose from {', '.join(OPERATIONS)})")
+        try:
+            mix[operation] = float(weight)
+        except ValueError:
+            raise argparse.ArgumentTypeError(f"weight for '{operation}' must be a number")
+    if not any(weight > 0 for weight in mix.values()):
+        raise argparse.ArgumentTypeError("at least one operation needs a positive weight")
+    return mix
+
+def print_report(stats, duration, concurrency):
+    """Per-endpoint throughput and latency table"""
+    total = sum(len(endpoint.latencies) for endpoint in stats.values())
+    errors = sum(endpoint.errors for endpoint in stats.values())
+    print(f"\n{total} requests in {duration:.1f}s with {concurrency} scanners: "
+          f"{total / duration:,.1f} req/s, {errors} errors")
+    print(f"{'Endpoint':<40} {'Requests':>8} {'Errors':>7} {'req/s':>8} {'p50 ms':>8} {'p95 ms':>8} {'p99 ms':>8} {'max ms':>8}")
+    for name, endpoint in sorted(stats.items()):
+        row = endpoint.summary(duration)
+        print(f"{name:<40} {row['requests']:>8} {row['errors']:>7} {row['rps']:>8.1f} "
+              f"{row['p50_ms']:>8.1f} {row['p95_ms']:>8.1f} {row['p99_ms']:>8.1f} {row['max_ms']:>8.1f}")
+        if row['errors']:
+            print(f"{'':<40} statuses: {row['statuses']}")
+
+def load_app(database):
+    """Import the backend against a local SQLite file (must run before anything imports backend.main)"""
+    os.environ["DATABASE_URL"] = f"sqlite:///{database}"
+    sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+    from backend.main import app, engine, migrate_schema
+    migrate_schema(engine)
+    return app
+
+async def run_load_test(args):
+    mix = parse_mix(args.mix)
+    limits = httpx.Limits(max_connections=args.concurrency, max_keepalive_connections=args.concurrency)
+    timeout = httpx.Timeout(args.timeout)
+
+    if args.in_process:
+        database = args.database or os.path.join(tempfile.mkdtemp(prefix="qr_load_"), "load_test.db")
+        print(f"Running in-process against sqlite:///{database}")
+        app = load_app(database)
+        transport = httpx.ASGITransport(app=app)
+        async with app.router.lifespan_context(app):
+            async with httpx.AsyncClient(transport=transport, base_url="http://load-test", limits=limits, timeout=timeout) as client:
+                return await run_scenarios(LoadTest(client, args), mix, register=True)
+
+    print(f"Running against {args.url}")
+    async with httpx.AsyncClient(base_url=args.url, limits=limits, timeout=timeout) as client:
+        return await run_scenarios(LoadTest(client, args), mix, register=False)
+
+async def run_scenarios(test, mix, register):
+    args = test.args
+    print(f"Setting up {args.students} students and event '{args.event}'...")
+    started = time.perf_counter()
+    await test.setup(register)
+    if args.verbose:
+        print_report(test.stats, time.perf_counter() - started, args.concurrency)
+
+    print(f"Running {args.concurrency} scanners for {args.duration:g}s (mix: {args.mix})...")
+    duration = await test.run(mix)
+    print_report(test.stats, duration, args.concurrency)
+
+    results = {
+        "concurrency": args.concurrency,
+        "duration_s": duration,
+        "mix": mix,
+        "endpoints": {name: endpoint.summary(duration) for name, endpoint in test.stats.items()},
+    }
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump(results, f, indent=2)
+        print(f"Results written to {args.json}")
+    return results
+
+def build_parser():
+    parser = argparse.ArgumentParser(description="QR Attendance System - API Load Test")
+    target = parser.add_mutually_exclusive_group()
+    target.add_argument("--url", default=BASE_URL, help=f"running API to test (default: {BASE_URL})")
+    target.add_argument("--in-process", action="store_true",
+                        help="run the app inside this process on a local SQLite database instead of over HTTP")
+    parser.add_argument("--database", help="SQLite file for --in-process (default: a new temporary file)")
+    parser.add_argument("--concurrency", type=int, default=20, help="simultaneous scanners (default: 20)")
+    parser.add_argument("--duration", type=float, default=30, help="seconds to run the scan mix (default: 30)")
+    parser.add_argument("--mix", default=DEFAULT_MIX,
+                        help=f"operation weights from {', '.join(OPERATIONS)} (default: {DEFAULT_MIX})")
+    parser.add_argument("--students", type=int, default=200, help="students created and scanned (default: 200)")
+    parser.add_argument("--event", default=EVENT_NAME, help=f"event to scan into (default: {EVENT_NAME})")
+    parser.add_argument("--username", default=USERNAME)
+    parser.add_argument("--password", default=PASSWORD)
+    parser.add_argument("--timeout", type=float, default=30, help="per-request timeout in seconds (default: 30)")
+    parser.add_argument("--seed", type=int, default=1, help="random seed for the scan mix (default: 1)")
+    parser.add_argument("--json", help="also write the results to this JSON file")
+    parser.add_argument("--verbose", action="store_true", help="also report the setup requests")
+    return parser
+
+def main():
+    """Run the load test"""
+    args = build_parser().parse_args()
+    try:
+        parse_mix(args.mix)
+    except argparse.ArgumentTypeError as e:
+        print(f"❌ --mix: {e}")
+        return 1
+    print("QR Attendance System - API Load Test")
+    print("====================================")
+    try:
+        asyncio.run(run_load_test(args))
+    except RuntimeError as e:
+        print(f"❌ {e}")
+        return 1
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -1,26 +1,174 @@
 # QR Attendance System - Data Migration Script
 # Migrates data from localStorage (JSON files) to SQL Server database
 
+import argparse
+import hashlib
+import io
 import json
 import os
 import sys
+import time
 from datetime import datetime, date
-from sqlalchemy import create_engine
 from sqlalchemy.orm import sessionmaker
 from sqlalchemy.dialects.mssql import UNIQUEIDENTIFIER
-from backend.main import Base, Student, Event, AttendanceRecord, User, APIKey, hash_password
+from backend.main import Student, Event, AttendanceRecord, User, APIKey, hash_password, create_db_engine, rebuild_attendance_summary, migrate_schema, utc_epoch_ms
 
-def load_json_data(file_path):
-    """Load JSON data from file"""
+# Rows inserted per bulk statement / transaction
+MIGRATION_CHUNK_SIZE = int(os.getenv("MIGRATION_CHUNK_SIZE", "1000"))
+
+# Streaming reader limits: characters per read, and the largest single record accepted
+READ_CHUNK_CHARS = 64 * 1024
+MAX_RECORD_CHARS = 16 * 1024 * 1024
+
+class JsonRecordReader:
+    """Yield records one at a time from a JSON array file or an NDJSON file.
+    
+    Only the read buffer and the record being parsed are held in memory, so
+    peak memory does not depend on the size of the export. After each record,
+    ``offset`` (bytes into the file) and ``records`` point just past it; a
+    reader created with those values continues from there.
+    """
+    
+    def __init__(self, file_path, offset=0, records=0):
+        self.file_path = file_path
+        self.offset = offset
+        self.records = records
+    
+    def is_array(self):
+        """A file whose first non-blank character is '[' holds one JSON array, anything else is NDJSON"""
+        with open(self.file_path, 'r', encoding='utf-8-sig') as f:
+            while True:
+                chunk = f.read(4096)
+                if not chunk:
+                    return False
+                stripped = chunk.lstrip()
+                if stripped:
+                    return stripped[0] == '['
+    
+    def __iter__(self):
+        decoder = json.JSONDecoder()
+        array = self.is_array()
+        with open(self.file_path, 'rb') as raw:
+            raw.seek(self.offset)
+            text = io.TextIOWrapper(raw, encoding='utf-8', newline='')
+            buffer = ''
+            pos = 0
+            eof = False
+            # Resumed readers start just after a record; fresh ones before the opening '['
+            expect_open = array and self.offset == 0
+            after_value = array and self.offset > 0
+            
+            def consume(count):
+                nonlocal pos
+                self.offset += len(buffer[pos:pos + count].encode('utf-8'))
+                pos += count
+            
+            while True:
+                # Keep at least one unread character (or reach EOF) before deciding anything
+                if pos >= len(buffer) - 1 and not eof:
+                    chunk = text.read(READ_CHUNK_CHARS)
+                    buffer = buffer[pos:] + chunk
+                    pos = 0
+                    eof = not chunk
+                    continue
+                
+                if pos < len(buffer) and buffer[pos] in ' \t\r\n\ufeff':
+                    consume(1)
+                    continue
+                if pos >= len(buffer):
+                    if array:
+                        raise ValueError(f"unexpected end of file at byte {self.offset} (missing ']')")
+                    return
+                
+                char = buffer[pos]
+                if expect_open:
+                    if char != '[':
+                        raise ValueError(f"expected '[' at byte {self.offset}")
+                    consume(1)
+                    expect_open = False
+                    continue
+                if array and char == ']':
+                    return
+                if after_value:
+                    if char != ',':
+                        raise ValueError(f"expected ',' or ']' at byte {self.offset}")
+                    consume(1)
+                    after_value = False
+                    continue
+                
+                try:
+                    record, end = decoder.raw_decode(buffer, pos)
+                    # A value must be followed by a delimiter, otherwise it may continue
+                    # in the next read (e.g. a number split across two reads)
+                    complete = eof or (end < len(buffer) and buffer[end] in ' \t\r\n,]')
+                except json.JSONDecodeError as e:
+                    if eof:
+                        raise ValueError(f"invalid JSON record at byte {self.offset}: {e.msg}") from e
+                    complete = False
+                if not complete:
+                    if len(buffer) - pos > MAX_RECORD_CHARS:
+                        raise ValueError(f"record at byte {self.offset} is larger than {MAX_RECORD_CHARS} characters")
+                    chunk = text.read(READ_CHUNK_CHARS)
+                    buffer = buffer[pos:] + chunk
+                    pos = 0
+                    eof = not chunk
+                    continue
+                
+                consume(end - pos)
+                self.records += 1
+                after_value = array
+                yield record
+
+def file_fingerprint(file_path):
+    """Hash of the first 64 KiB, used to check a checkpoint belongs to this file"""
+    with open(file_path, 'rb') as f:
+        return hashlib.sha256(f.read(64 * 1024)).hexdigest()
+
+def load_checkpoint(checkpoint_path, file_path):
+    """Return (offset, records) to resume from, or (0, 0)"""
     try:
-        with open(file_path, 'r', encoding='utf-8') as f:
-            return json.load(f)
-    except FileNotFoundError:
-        print(f"File not found: {file_path}")
-        return []
-    except json.JSONDecodeError as e:
+        with open(checkpoint_path, 'r', encoding='utf-8') as f:
+            checkpoint = json.load(f)
+    except (FileNotFoundError, json.JSONDecodeError):
+        return 0, 0
+    if checkpoint.get('fingerprint') != file_fingerprint(file_path) or checkpoint.get('offset', 0) > os.path.getsize(file_path):
+        print(f"Checkpoint {checkpoint_path} does not match {file_path}, starting from the beginning")
+        return 0, 0
+    return checkpoint['offset'], checkpoint['records']
+
+def save_checkpoint(checkpoint_path, reader):
+    """Record the position after the last committed record (written atomically)"""
+    temp_path = checkpoint_path + '.tmp'
+    with open(temp_path, 'w', encoding='utf-8') as f:
+        json.dump({
+            'file': reader.file_path,
+            'fingerprint': file_fingerprint(reader.file_path),
+            'offset': reader.offset,
+            'records': reader.records,
+            'saved_at': datetime.now().isoformat()
+        }, f)
+    os.replace(temp_path, checkpoint_path)
+
+def migrate_file(db_session, file_path, migrate, resume=False):
+    """Stream one JSON/NDJSON file through a migrate_* function, checkpointing after every commit"""
+    checkpoint_path = file_path + '.checkpoint'
+    offset, records = load_checkpoint(checkpoint_path, file_path) if resume else (0, 0)
+    reader = JsonRecordReader(file_path, offset, records)
+    if records:
+        print(f"Resuming {file_path} after record {records} (byte {offset})")
+    
+    try:
+        migrate(db_session, reader, checkpoint=lambda: save_checkpoint(checkpoint_path, reader))
+    except ValueError as e:
+        db_session.rollback()
         print(f"Error parsing JSON from {file_path}: {e}")
-        return []
+        if os.path.exists(checkpoint_path):
+            print("Committed records are kept; fix the file and rerun with --resume to continue")
+        return False
+    
+    if os.path.exists(checkpoint_path):
+        os.remove(checkpoint_path)
+    return True
 
 def parse_date(date_str):
     """Parse date string to date object"""
@@ -51,130 +199,171 @@ def parse_time(time_str):
     except:
         return None
 
-def migrate_students(db_session, students_data):
+def chunks(records, size=MIGRATION_CHUNK_SIZE):
+    """Yield lists of up to size records from any iterable"""
+    chunk = []
+    for record in records:
+        chunk.append(record)
+        if len(chunk) >= size:
+            yield chunk
+            chunk = []
+    if chunk:
+        yield chunk
+
+def report_progress(label, processed, migrated, started):
+    """Print running totals and throughput"""
+    elapsed = max(time.perf_counter() - started, 1e-6)
+    print(f"   {label}: {processed} processed, {migrated} inserted ({processed / elapsed:,.0f} rows/sec)")
+
+def migrate_students(db_session, students_data, checkpoint=None):
     """Migrate students data"""
     print("Migrating students...")
+    started = time.perf_counter()
     migrated_count = 0
+    skipped_count = 0
+    processed_count = 0
     
-    for student_data in students_data:
-        try:
-            # Check if student already exists
-            existing_student = db_session.query(Student).filter(
-                Student.StudentID == student_data.get('studentId', '')
-            ).first()
-            
-            if not existing_student:
-                new_student = Student(
-                    StudentID=student_data.get('studentId', ''),
-                    StudentName=student_data.get('studentName', ''),
-                    Section=student_data.get('section', ''),
-                    CreatedAt=datetime.utcnow(),
-                    UpdatedAt=datetime.utcnow()
-                )
-                db_session.add(new_student)
-                migrated_count += 1
-            else:
-                print(f"Student {student_data.get('studentId')} already exists, skipping...")
+    # One query for every existing key instead of one SELECT per student
+    existing_ids = {student_id for (student_id,) in db_session.query(Student.StudentID)}
+    
+    for chunk in chunks(students_data):
+        now = datetime.utcnow()
+        mappings = []
+        for student_data in chunk:
+            try:
+                student_id = student_data.get('studentId', '')
+                if student_id in existing_ids:
+                    skipped_count += 1
+                    continue
                 
-        except Exception as e:
-            print(f"Error migrating student {student_data}: {e}")
+                mappings.append({
+                    'StudentID': student_id,
+                    'StudentName': student_data.get('studentName', ''),
+                    'Section': student_data.get('section', ''),
+                    'CreatedAt': now,
+                    'UpdatedAt': now
+                })
+                existing_ids.add(student_id)
+                
+            except Exception as e:
+                print(f"Error migrating student {student_data}: {e}")
+        
+        db_session.bulk_insert_mappings(Student, mappings)
+        db_session.commit()
+        if checkpoint:
+            checkpoint()
+        migrated_count += len(mappings)
+        processed_count += len(chunk)
+        report_progress("Students", processed_count, migrated_count, started)
     
-    db_session.commit()
-    print(f"Migrated {migrated_count} students")
+    print(f"Migrated {migrated_count} students ({skipped_count} already existed, skipped)")
+
+def create_missing_events(db_session, event_names, event_map):
+    """Create events not in event_map and add their IDs to it"""
+    new_events = [
+        Event(
+            EventName=event_name,
+            EventDescription=f"Migrated event: {event_name}",
+            CreatedAt=datetime.utcnow(),
+            UpdatedAt=datetime.utcnow()
+        )
+        for event_name in sorted(event_names) if event_name not in event_map
+    ]
+    if new_events:
+        db_session.add_all(new_events)
+        # Flush assigns the IDs; reading them after commit() would reload each event with its own SELECT
+        db_session.flush()
+        event_map.update((new_event.EventName, new_event.EventID) for new_event in new_events)
+        db_session.commit()
 
-def migrate_events_and_attendance(db_session, attendance_data):
+def migrate_events_and_attendance(db_session, attendance_data, checkpoint=None):
     """Migrate events and attendance records"""
     print("Migrating events and attendance records...")
+    started = time.perf_counter()
+    migrated_count = 0
+    processed_count = 0
+    skipped = {'existing': 0, 'incomplete': 0, 'unknown student': 0, 'unknown event': 0}
     
-    # Get unique events
-    events = set()
-    for record in attendance_data:
-        if record.get('event'):
-            events.add(record['event'])
+    # Preload keys once; lookups below are set/dict hits instead of SELECTs
+    student_ids = {student_id for (student_id,) in db_session.query(Student.StudentID)}
+    event_map = {name: event_id for name, event_id in db_session.query(Event.EventName, Event.EventID)}
+    existing_keys = set()
+    loaded_event_ids = set()
     
-    # Create events
-    event_map = {}
-    for event_name in events:
+    for chunk in chunks(attendance_data):
+        # Create events the first time they are referenced
+        event_names = {record['event'] for record in chunk if isinstance(record, dict) and record.get('event')}
         try:
-            existing_event = db_session.query(Event).filter(
-                Event.EventName == event_name
-            ).first()
-            
-            if not existing_event:
-                new_event = Event(
-                    EventName=event_name,
-                    EventDescription=f"Migrated event: {event_name}",
-                    CreatedAt=datetime.utcnow(),
-                    UpdatedAt=datetime.utcnow()
-                )
-                db_session.add(new_event)
-                db_session.flush()  # Get the ID
-                event_map[event_name] = new_event.EventID
-            else:
-                event_map[event_name] = existing_event.EventID
-                
+            create_missing_events(db_session, event_names, event_map)
         except Exception as e:
-            print(f"Error creating event {event_name}: {e}")
-    
-    db_session.commit()
-    
-    # Migrate attendance records
-    migrated_count = 0
-    for record_data in attendance_data:
-        try:
-            student_id = record_data.get('studentId', '')
-            event_name = record_data.get('event', '')
-            
-            if not student_id or not event_name:
-                continue
+            db_session.rollback()
+            print(f"Error creating events {sorted(event_names)}: {e}")
+        
+        # Existing attendance keys, loaded once per event
+        for event_id in {event_map[name] for name in event_names if name in event_map} - loaded_event_ids:
+            existing_keys.update(
+                (student_id, event_id, attendance_date)
+                for student_id, attendance_date in db_session.query(
+                    AttendanceRecord.StudentID, AttendanceRecord.AttendanceDate
+                ).filter(AttendanceRecord.EventID == event_id)
+            )
+            loaded_event_ids.add(event_id)
+        
+        now = datetime.utcnow()
+        now_ms = utc_epoch_ms(now)
+        mappings = []
+        for record_data in chunk:
+            try:
+                student_id = record_data.get('studentId', '')
+                event_name = record_data.get('event', '')
                 
-            # Check if student exists
-            student = db_session.query(Student).filter(
-                Student.StudentID == student_id
-            ).first()
-            
-            if not student:
-                print(f"Student {student_id} not found, skipping attendance record")
-                continue
-            
-            event_id = event_map.get(event_name)
-            if not event_id:
-                print(f"Event {event_name} not found, skipping attendance record")
-                continue
-            
-            attendance_date = parse_date(record_data.get('date', ''))
-            time_in = parse_time(record_data.get('timeIn', ''))
-            time_out = parse_time(record_data.get('timeOut', ''))
-            
-            # Check if record already exists
-            existing_record = db_session.query(AttendanceRecord).filter(
-                AttendanceRecord.StudentID == student_id,
-                AttendanceRecord.EventID == event_id,
-                AttendanceRecord.AttendanceDate == attendance_date
-            ).first()
-            
-            if not existing_record:
-                new_record = AttendanceRecord(
-                    StudentID=student_id,
-                    EventID=event_id,
-                    AttendanceDate=attendance_date,
-                    TimeIn=time_in,
-                    TimeOut=time_out,
-                    CheckInMs=record_data.get('checkInMs', int(datetime.utcnow().timestamp() * 1000)),
-                    LastUpdateMs=record_data.get('lastUpdateMs', int(datetime.utcnow().timestamp() * 1000)),
-                    CreatedAt=datetime.utcnow(),
-                    UpdatedAt=datetime.utcnow()
-                )
-                db_session.add(new_record)
-                migrated_count += 1
-            else:
-                print(f"Attendance record for {student_id} on {attendance_date} already exists, skipping...")
+                if not student_id or not event_name:
+                    skipped['incomplete'] += 1
+                    continue
                 
-        except Exception as e:
-            print(f"Error migrating attendance record {record_data}: {e}")
+                if student_id not in student_ids:
+                    skipped['unknown student'] += 1
+                    continue
+                
+                event_id = event_map.get(event_name)
+                if not event_id:
+                    skipped['unknown event'] += 1
+                    continue
+                
+                attendance_date = parse_date(record_data.get('date', ''))
+                key = (student_id, event_id, attendance_date)
+                if key in existing_keys:
+                    skipped['existing'] += 1
+                    continue
+                
+                mappings.append({
+                    'StudentID': student_id,
+                    'EventID': event_id,
+                    'AttendanceDate': attendance_date,
+                    'TimeIn': parse_time(record_data.get('timeIn', '')),
+                    'TimeOut': parse_time(record_data.get('timeOut', '')),
+                    'CheckInMs': record_data.get('checkInMs', now_ms),
+                    'LastUpdateMs': record_data.get('lastUpdateMs', now_ms),
+                    'CreatedAt': now,
+                    'UpdatedAt': now
+                })
+                existing_keys.add(key)
+                
+            except Exception as e:
+                print(f"Error migrating attendance record {record_data}: {e}")
+        
+        db_session.bulk_insert_mappings(AttendanceRecord, mappings)
+        db_session.commit()
+        if checkpoint:
+            checkpoint()
+        migrated_count += len(mappings)
+        processed_count += len(chunk)
+        report_progress("Attendance records", processed_count, migrated_count, started)
     
-    db_session.commit()
     print(f"Migrated {migrated_count} attendance records")
+    for reason, count in skipped.items():
+        if count:
+            print(f"   Skipped {count} records ({reason})")
 
 def create_default_admin(db_session):
     """Create default admin user"""
@@ -203,8 +392,14 @@ def create_default_admin(db_session):
     except Exception as e:
         print(f"Error creating admin user: {e}")
 
-def main():
+def main(argv=None):
     """Main migration function"""
+    parser = argparse.ArgumentParser(description="Import students and attendance from JSON or NDJSON exports")
+    parser.add_argument("--students", default="students_data.json", help="students file (JSON array or NDJSON)")
+    parser.add_argument("--attendance", default="attendance_data.json", help="attendance file (JSON array or NDJSON)")
+    parser.add_argument("--resume", action="store_true", help="continue each file from its .checkpoint left by an interrupted run")
+    args = parser.parse_args(argv)
+    
     print("QR Attendance System - Data Migration")
     print("=====================================")
     
@@ -217,9 +412,14 @@ def main():
         return
     
     try:
-        # Create database engine and session
-        engine = create_engine(DATABASE_URL, echo=True)
-        Base.metadata.create_all(bind=engine)
+        # Create database engine and session (same DB_* pool/echo settings as the API)
+        engine = create_db_engine(DATABASE_URL)
+        # Same versioned schema check as the API: one query when the database is already current
+        started = time.perf_counter()
+        before, after = migrate_schema(engine)
+        if before != after:
+            print(f"Database schema migrated from version {before if before is not None else 'none'} to {after}")
+        print(f"Schema version {after} checked in {(time.perf_counter() - started) * 1000:.0f} ms")
         SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
         db_session = SessionLocal()
         
@@ -228,9 +428,9 @@ def main():
         # Create default admin user
         create_default_admin(db_session)
         
-        # Look for JSON data files in the current directory
-        students_file = "students_data.json"
-        attendance_file = "attendance_data.json"
+        # Look for JSON data files (current directory unless given on the command line)
+        students_file = args.students
+        attendance_file = args.attendance
         
         # Check if files exist
         if not os.path.exists(students_file) and not os.path.exists(attendance_file):
@@ -277,13 +477,17 @@ def main():
             
         else:
             # Migrate from JSON files
+            # Records are streamed from disk in MIGRATION_CHUNK_SIZE batches
             if os.path.exists(students_file):
-                students_data = load_json_data(students_file)
-                migrate_students(db_session, students_data)
+                migrate_file(db_session, students_file, migrate_students, args.resume)
             
             if os.path.exists(attendance_file):
-                attendance_data = load_json_data(attendance_file)
-                migrate_events_and_attendance(db_session, attendance_data)
+                migrate_file(db_session, attendance_file, migrate_events_and_attendance, args.resume)
+        
+        # Records were inserted directly, so recompute the per-section totals
+        rows = rebuild_attendance_summary(db_session)
+        db_session.commit()
+        print(f"Rebuilt attendance summary ({rows} rows)")
         
         print("\nMigration completed successfully!")
         print("\nNext steps:")
@@ -2,30 +2,116 @@
 # Easy PC migration with SQL Server
 
 import pyodbc
+import argparse
+import gzip
+import hashlib
+import io
 import json
-from datetime import datetime
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, date
 import os
+import sys
+import time
+
+try:
+    # Optional: only needed for zstd-compressed backups
+    import zstandard
+except ImportError:
+    zstandard = None
+
+# Streaming backups: rows per fetchmany() round trip, and where they are written
+BACKUP_FETCH_ROWS = int(os.getenv("BACKUP_FETCH_ROWS", "5000"))
+BACKUP_DIR = "database_backup"
+BACKUP_WORKERS = int(os.getenv("BACKUP_WORKERS", "1"))
+MANIFEST_FILE = "manifest.json"
+
+# Tables in restore order (parents before children) as (name, query, ORDER BY, column prefix
+# for incremental filters). EventName travels with each attendance record so restores can remap EventID.
+BACKUP_TABLES = [
+    ("users", "SELECT UserID, Username, PasswordHash, FullName, Role, CreatedAt, UpdatedAt, IsActive FROM Users", "UserID", ""),
+    ("students", "SELECT StudentID, StudentName, Section, CreatedAt, UpdatedAt, IsActive FROM Students", "StudentID", ""),
+    ("events", "SELECT EventID, EventName, EventDescription, CreatedAt, UpdatedAt, IsActive FROM Events", "EventID", ""),
+    ("attendance_records", """
+        SELECT ar.RecordID, ar.StudentID, ar.EventID, e.EventName, ar.AttendanceDate, ar.TimeIn, ar.TimeOut,
+               ar.CheckInMs, ar.LastUpdateMs, ar.CreatedAt, ar.UpdatedAt
+        FROM AttendanceRecords ar
+        LEFT JOIN Events e ON e.EventID = ar.EventID
+    """, "ar.RecordID", "ar."),
+]
+
+# Highest value of each column per table is stored in the manifest as the backup's watermark;
+# an incremental backup exports the rows at or above its base backup's watermark
+WATERMARK_COLUMNS = ("UpdatedAt", "LastUpdateMs")
+
+# Restores: rows per executemany() / commit, and where rows the database refuses are written
+RESTORE_CHUNK_ROWS = int(os.getenv("RESTORE_CHUNK_ROWS", "5000"))
+RESTORE_WORKERS = int(os.getenv("RESTORE_WORKERS", "1"))
+REJECT_FILE = "restore_rejects.ndjson"
+
+# Backup table -> (database table, inserted columns); identity columns are regenerated
+RESTORE_TABLES = [
+    ("users", "Users", ["Username", "PasswordHash", "FullName", "Role", "CreatedAt", "UpdatedAt", "IsActive"]),
+    ("students", "Students", ["StudentID", "StudentName", "Section", "CreatedAt", "UpdatedAt", "IsActive"]),
+    ("events", "Events", ["EventName", "EventDescription", "CreatedAt", "UpdatedAt", "IsActive"]),
+    ("attendance_records", "AttendanceRecords", ["StudentID", "EventID", "AttendanceDate", "TimeIn", "TimeOut",
+                                                 "CheckInMs", "LastUpdateMs", "CreatedAt", "UpdatedAt"]),
+]
+DATETIME_COLUMNS = {"CreatedAt", "UpdatedAt", "TimeIn", "TimeOut"}
+
+# AttendanceDailySummary recomputed from vw_AttendanceSummary after a restore (the same totals
+# `python db_tools.py check-summary` compares against on SQL Server)
+REBUILD_SUMMARY_SQL = """
+INSERT INTO AttendanceDailySummary (EventID, AttendanceDate, Section, CheckedIn, CheckedOut, StillInside,
+                                    DurationCount, DurationTotalMinutes, UpdatedAt)
+SELECT e.EventID, v.AttendanceDate, v.Section,
+       COUNT(v.TimeIn), COUNT(v.TimeOut),
+       SUM(CASE WHEN v.TimeIn IS NOT NULL AND v.TimeOut IS NULL THEN 1 ELSE 0 END),
+       COUNT(v.DurationMinutes), COALESCE(SUM(v.DurationMinutes), 0), SYSUTCDATETIME()
+FROM vw_AttendanceSummary v
+INNER JOIN Events e ON e.EventName = v.EventName
+GROUP BY e.EventID, v.AttendanceDate, v.Section
+"""
+
+# Natural keys incremental restores match rows on (identity columns differ between databases)
+UPSERT_KEYS = {
+    "users": ["Username"],
+    "students": ["StudentID"],
+    "events": ["EventName"],
+    "attendance_records": ["StudentID", "EventID", "AttendanceDate"],
+}
+
+# Tables within a stage have no foreign keys between them and may be restored side by side;
+# attendance records need their students and events first
+RESTORE_STAGES = [["users", "students", "events"], ["attendance_records"]]
+
+def get_pyodbc_connection_string(connection_string):
+    """Convert SQLAlchemy URL to pyodbc connection string"""
+    if "mssql+pyodbc://" in connection_string:
+        # Extract connection details
+        parts = connection_string.replace("mssql+pyodbc://", "").split("/")
+        auth_server = parts[0]
+        database = parts[1].split("?")[0]
+        
+        if "@" in auth_server:
+            auth, server = auth_server.split("@")
+            username, password = auth.split(":")
+            return f"DRIVER={{ODBC Driver 17 for SQL Server}};SERVER={server};DATABASE={database};UID={username};PWD={password}"
+        return f"DRIVER={{ODBC Driver 17 for SQL Server}};SERVER={auth_server};DATABASE={database};Trusted_Connection=yes"
+    return connection_string
+
+def run_jobs(jobs, workers):
+    """Run {name: fn} jobs on up to `workers` threads (one after another when workers is 1); returns {name: result}"""
+    if workers <= 1 or len(jobs) <= 1:
+        return {name: job() for name, job in jobs.items()}
+    with ThreadPoolExecutor(max_workers=min(workers, len(jobs))) as executor:
+        futures = {name: executor.submit(job) for name, job in jobs.items()}
+        return {name: future.result() for name, future in futures.items()}
 
 def backup_database_data(connection_string):
     """Backup all data to JSON files"""
     try:
-        # Convert SQLAlchemy URL to pyodbc connection string
-        if "mssql+pyodbc://" in connection_string:
-            # Extract connection details
-            parts = connection_string.replace("mssql+pyodbc://", "").split("/")
-            auth_server = parts[0]
-            database = parts[1].split("?")[0]
-            
-            if "@" in auth_server:
-                auth, server = auth_server.split("@")
-                username, password = auth.split(":")
-                conn_str = f"DRIVER={{ODBC Driver 17 for SQL Server}};SERVER={server};DATABASE={database};UID={username};PWD={password}"
-            else:
-                conn_str = f"DRIVER={{ODBC Driver 17 for SQL Server}};SERVER={auth_server};DATABASE={database};Trusted_Connection=yes"
-        else:
-            conn_str = connection_string
-        
-        conn = pyodbc.connect(conn_str)
+        conn = pyodbc.connect(get_pyodbc_connection_string(connection_string))
         cursor = conn.cursor()
         
         print("📊 Backing up database data...")
@@ -114,30 +200,462 @@ def backup_database_data(connection_string):
         print(f"❌ Backup failed: {e}")
         return False
 
-def restore_database_data(connection_string):
+def json_value(value):
+    """Make a database value JSON serializable"""
+    if isinstance(value, (datetime, date)):
+        return value.isoformat()
+    if isinstance(value, (bytes, bytearray)):
+        return value.hex()
+    if value is not None and not isinstance(value, (str, int, float, bool)):
+        return str(value)
+    return value
+
+def open_compressed_writer(path, compression):
+    """Binary writer for a .gz or .zst backup file"""
+    if compression == "zstd":
+        if zstandard is None:
+            raise RuntimeError("zstd compression requires the zstandard package (pip install zstandard)")
+        return zstandard.ZstdCompressor(level=3).stream_writer(open(path, 'wb'), closefd=True)
+    return gzip.open(path, 'wb', compresslevel=6)
+
+def backup_table_ndjson(cursor, query, path, compression, params=()):
+    """Stream one query into a compressed NDJSON file.
+    
+    Returns (rows, sha256 of the uncompressed NDJSON, {watermark column: highest value}).
+    """
+    if params:
+        cursor.execute(query, params)
+    else:
+        cursor.execute(query)
+    columns = [column[0] for column in cursor.description]
+    watermark_columns = [(name, columns.index(name)) for name in WATERMARK_COLUMNS if name in columns]
+    watermark = {}
+    checksum = hashlib.sha256()
+    rows = 0
+    with open_compressed_writer(path, compression) as out:
+        while True:
+            batch = cursor.fetchmany(BACKUP_FETCH_ROWS)
+            if not batch:
+                break
+            for name, index in watermark_columns:
+                values = [row[index] for row in batch if row[index] is not None]
+                if values and (name not in watermark or max(values) > watermark[name]):
+                    watermark[name] = max(values)
+            data = "".join(
+                json.dumps(dict(zip(columns, map(json_value, row))), ensure_ascii=False, separators=(",", ":")) + "\n"
+                for row in batch
+            ).encode("utf-8")
+            checksum.update(data)
+            out.write(data)
+            rows += len(batch)
+    return rows, checksum.hexdigest(), watermark
+
+def incremental_filter(prefix, since):
+    """WHERE clause and parameters selecting rows changed at or after a table's watermark.
+    
+    Rows equal to the watermark are exported again; restores upsert, so the
+    overlap is harmless and rows written in the same instant are not lost.
+    """
+    conditions = [f"{prefix}{name} >= ?" for name in WATERMARK_COLUMNS if name in since]
+    params = [parse_backup_value(name, since[name]) for name in WATERMARK_COLUMNS if name in since]
+    return " OR ".join(conditions), params
+
+def merge_watermark(since, seen):
+    """Combine the base watermark with the highest values exported now"""
+    merged = dict(since)
+    for name, value in seen.items():
+        if name not in merged or value > parse_backup_value(name, merged[name]):
+            merged[name] = json_value(value)
+    return merged
+
+def load_manifest(backup_dir):
+    """Read a backup folder's manifest.json, or None when the folder has none"""
+    manifest_path = os.path.join(backup_dir, MANIFEST_FILE)
+    if not os.path.exists(manifest_path):
+        return None
+    with open(manifest_path, 'r', encoding='utf-8') as f:
+        return json.load(f)
+
+def backup_database_ndjson(connection_string, output_dir=BACKUP_DIR, compression="gzip", workers=BACKUP_WORKERS,
+                           since_dir=None):
+    """Backup all data as one compressed NDJSON file per table plus a manifest.
+    
+    With since_dir, only rows changed since that backup's watermark are
+    exported (an incremental backup); restore it on top of its base chain.
+    With workers > 1, tables are exported at the same time, each on its own
+    connection. The tables are then not read at one single point in time, so
+    stop the API (or anything else writing) while backing up.
+    """
+    try:
+        if compression == "zstd" and zstandard is None:
+            print("❌ zstd compression requires the zstandard package (pip install zstandard)")
+            return False
+        
+        base = None
+        if since_dir:
+            base = load_manifest(since_dir)
+            if base is None or 'watermark' not in base:
+                print(f"❌ {since_dir} has no backup watermark; take a full backup first")
+                return False
+            if os.path.abspath(since_dir) == os.path.abspath(output_dir):
+                print("❌ An incremental backup needs its own --output folder")
+                return False
+        
+        os.makedirs(output_dir, exist_ok=True)
+        
+        kind = f"incremental since {base['backup_date']}" if base else "full"
+        print(f"📊 Backing up database data to {output_dir}/ ({kind}, {compression} NDJSON, {max(workers, 1)} worker(s))...")
+        
+        extension = ".ndjson.zst" if compression == "zstd" else ".ndjson.gz"
+        manifest = {
+            'backup_date': datetime.now().isoformat(),
+            'format': 'ndjson',
+            'type': 'incremental' if base else 'full',
+            'compression': compression,
+            'tables': {}
+        }
+        if base:
+            manifest['base_backup_date'] = base['backup_date']
+        
+        def backup_job(table, query, order_by, prefix):
+            def job():
+                started = time.perf_counter()
+                file_name = table + extension
+                since = base['watermark'].get(table, {}) if base else {}
+                conditions, params = incremental_filter(prefix, since)
+                sql = f"{query} {'WHERE ' + conditions if conditions else ''} ORDER BY {order_by}"
+                conn = pyodbc.connect(get_pyodbc_connection_string(connection_string))
+                try:
+                    rows, checksum, seen = backup_table_ndjson(conn.cursor(), sql, os.path.join(output_dir, file_name),
+                                                               compression, params)
+                finally:
+                    conn.close()
+                elapsed = max(time.perf_counter() - started, 1e-6)
+                print(f"   {table}: {rows} rows ({rows / elapsed:,.0f} rows/sec)")
+                return {
+                    'file': file_name,
+                    'rows': rows,
+                    'sha256': checksum,
+                    'bytes': os.path.getsize(os.path.join(output_dir, file_name))
+                }, merge_watermark(since, seen)
+            return job
+        
+        started = time.perf_counter()
+        results = run_jobs({table: backup_job(table, *rest) for table, *rest in BACKUP_TABLES}, workers)
+        # Keep the manifest in restore order whichever table finished first
+        manifest['tables'] = {table: results[table][0] for table, *_ in BACKUP_TABLES}
+        manifest['watermark'] = {table: results[table][1] for table, *_ in BACKUP_TABLES}
+        print(f"⏱️  Backup took {time.perf_counter() - started:.1f}s")
+        
+        # The manifest is written last, so a backup without one is incomplete
+        with open(os.path.join(output_dir, MANIFEST_FILE), 'w', encoding='utf-8') as f:
+            json.dump(manifest, f, indent=2)
+        
+        print("✅ Database backup completed!")
+        print(f"   📁 Folder: {output_dir}")
+        print(f"   👥 Students: {manifest['tables']['students']['rows']}")
+        print(f"   📅 Events: {manifest['tables']['events']['rows']}")
+        print(f"   📊 Attendance Records: {manifest['tables']['attendance_records']['rows']}")
+        print(f"   👤 Users: {manifest['tables']['users']['rows']}")
+        return True
+        
+    except Exception as e:
+        print(f"❌ Backup failed: {e}")
+        return False
+
+def open_compressed_reader(path):
+    """Line-iterable binary reader for a .gz or .zst backup file"""
+    if path.endswith(".zst"):
+        if zstandard is None:
+            raise RuntimeError("zstd backups require the zstandard package (pip install zstandard)")
+        return io.BufferedReader(zstandard.ZstdDecompressor().stream_reader(open(path, 'rb'), closefd=True))
+    return gzip.open(path, 'rb')
+
+def read_backup_table(path):
+    """Yield one row dict per NDJSON line"""
+    with open_compressed_reader(path) as f:
+        for line in f:
+            if line.strip():
+                yield json.loads(line)
+
+def verify_backup(backup_dir, manifest):
+    """Check every table file against the manifest's row count and checksum; returns a list of problems"""
+    problems = []
+    for table, _, _ in RESTORE_TABLES:
+        entry = manifest['tables'].get(table)
+        if entry is None:
+            problems.append(f"{table}: missing from manifest")
+            continue
+        path = os.path.join(backup_dir, entry['file'])
+        if not os.path.exists(path):
+            problems.append(f"{table}: {entry['file']} not found")
+            continue
+        checksum = hashlib.sha256()
+        rows = 0
+        try:
+            with open_compressed_reader(path) as f:
+                for line in f:
+                    checksum.update(line)
+                    rows += 1
+        except Exception as e:
+            problems.append(f"{table}: cannot read {entry['file']}: {e}")
+            continue
+        if rows != entry['rows'] or checksum.hexdigest() != entry['sha256']:
+            problems.append(f"{table}: expected {entry['rows']} rows / sha256 {entry['sha256'][:12]}..., "
+                            f"found {rows} rows / sha256 {checksum.hexdigest()[:12]}...")
+    return problems
+
+def parse_backup_value(column, value):
+    """Turn backed-up ISO strings back into date/datetime parameters"""
+    if value is None or not isinstance(value, str):
+        return value
+    if column in DATETIME_COLUMNS:
+        return datetime.fromisoformat(value)
+    if column == "AttendanceDate":
+        return date.fromisoformat(value[:10])
+    return value
+
+def clear_existing_data(conn, cursor):
+    """Delete current rows, children before parents"""
+    try:
+        # Derived totals; rebuild_summary() recomputes them once the rows are back
+        cursor.execute("DELETE FROM AttendanceDailySummary")
+    except pyodbc.Error:
+        conn.rollback()  # Databases created before the summary table existed
+    cursor.execute("DELETE FROM AttendanceRecords")
+    cursor.execute("DELETE FROM APIKeys")  # Keys point at the old UserIDs
+    cursor.execute("DELETE FROM Students")
+    cursor.execute("DELETE FROM Events")
+    cursor.execute("DELETE FROM Users")
+    conn.commit()
+
+class RejectWriter:
+    """Collects rows the database refused into an NDJSON file, created on first use; shared by restore workers"""
+    
+    def __init__(self, path):
+        self.path = path
+        self.count = 0
+        self.by_table = {}
+        self._file = None
+        self._lock = threading.Lock()
+    
+    def write(self, table, row, error):
+        line = json.dumps({'table': table, 'error': str(error), 'row': row}, ensure_ascii=False, default=str) + "\n"
+        with self._lock:
+            if self._file is None:
+                self._file = open(self.path, 'w', encoding='utf-8')
+            self._file.write(line)
+            self.count += 1
+            self.by_table[table] = self.by_table.get(table, 0) + 1
+    
+    def close(self):
+        if self._file is not None:
+            self._file.close()
+
+def insert_rows(conn, cursor, table, rows, prepare, rejects):
+    """Insert rows with executemany in RESTORE_CHUNK_ROWS transactions; returns rows inserted.
+    
+    prepare(row) returns the parameter tuple or raises ValueError to reject the
+    row. When a chunk fails, it is retried row by row so only the offending
+    rows end up in the reject file.
+    """
+    _, table_name, columns = next(entry for entry in RESTORE_TABLES if entry[0] == table)
+    sql = f"INSERT INTO {table_name} ({', '.join(columns)}) VALUES ({', '.join('?' * len(columns))})"
+    inserted = 0
+    
+    def flush(chunk):
+        nonlocal inserted
+        if not chunk:
+            return
+        try:
+            cursor.executemany(sql, [params for _, params in chunk])
+            conn.commit()
+            inserted += len(chunk)
+        except pyodbc.Error:
+            conn.rollback()
+            for row, params in chunk:
+                try:
+                    cursor.execute(sql, params)
+                    inserted += 1
+                except pyodbc.Error as e:
+                    rejects.write(table, row, e)
+            conn.commit()
+    
+    chunk = []
+    for row in rows:
+        try:
+            chunk.append((row, prepare(row)))
+        except (ValueError, KeyError, TypeError) as e:
+            rejects.write(table, row, e)
+        if len(chunk) >= RESTORE_CHUNK_ROWS:
+            flush(chunk)
+            chunk = []
+    flush(chunk)
+    return inserted
+
+def restore_tables(conn, tables, rejects, workers=1, connect=None):
+    """Restore backup tables (name -> iterable of row dicts) into an emptied database.
+    
+    Events get new identity values, so attendance EventIDs are remapped in
+    memory through the event name instead of a lookup query per record.
+    With workers > 1 and a connect() factory, the tables of each
+    RESTORE_STAGES stage are inserted at the same time on separate
+    connections; the next stage starts once the whole stage is committed.
+    """
+    parallel = workers > 1 and connect is not None
+    cursor = conn.cursor()
+    
+    print("🗑️  Clearing existing data...")
+    clear_existing_data(conn, cursor)
+    
+    old_event_names = {}
+    event_ids = {}
+    
+    def row_params(columns):
+        return lambda row: tuple(parse_backup_value(column, row.get(column)) for column in columns)
+    
+    def remember_event(params_for):
+        def prepare(row):
+            old_event_names[row.get('EventID')] = row['EventName']
+            return params_for(row)
+        return prepare
+    
+    def remap_event(params_for):
+        def prepare(row):
+            event_name = row.get('EventName') or old_event_names.get(row.get('EventID'))
+            if event_name not in event_ids:
+                raise ValueError(f"event {event_name or row.get('EventID')} not found in backup")
+            return params_for(dict(row, EventID=event_ids[event_name]))
+        return prepare
+    
+    def restore_job(table, table_name, prepare):
+        def job():
+            job_conn = connect() if parallel else conn
+            try:
+                job_cursor = job_conn.cursor()
+                if hasattr(job_cursor, "fast_executemany"):
+                    # Send each executemany() chunk to SQL Server as one parameter array
+                    job_cursor.fast_executemany = True
+                started = time.perf_counter()
+                count = insert_rows(job_conn, job_cursor, table, tables.get(table, []), prepare, rejects)
+            finally:
+                if parallel:
+                    job_conn.close()
+            elapsed = max(time.perf_counter() - started, 1e-6)
+            rejected = rejects.by_table.get(table, 0)
+            print(f"   {table_name}: {count} rows ({count / elapsed:,.0f} rows/sec)"
+                  + (f", {rejected} rejected" if rejected else ""))
+            return count
+        return job
+    
+    counts = {}
+    started = time.perf_counter()
+    for stage in RESTORE_STAGES:
+        jobs = {}
+        for table, table_name, columns in RESTORE_TABLES:
+            if table not in stage:
+                continue
+            prepare = row_params(columns)
+            if table == "events":
+                prepare = remember_event(prepare)
+            elif table == "attendance_records":
+                # One query for the new EventIDs; the event name carries each record across
+                cursor.execute("SELECT EventID, EventName FROM Events")
+                event_ids.update((row[1], row[0]) for row in cursor.fetchall())
+                prepare = remap_event(prepare)
+            jobs[table] = restore_job(table, table_name, prepare)
+        counts.update(run_jobs(jobs, workers if parallel else 1))
+    print(f"⏱️  Restore took {time.perf_counter() - started:.1f}s")
+    return counts
+
+def upsert_rows(conn, cursor, table, rows, prepare, rejects):
+    """Update rows matching UPSERT_KEYS and insert the others, committing every RESTORE_CHUNK_ROWS rows.
+    
+    Returns (inserted, updated). Incremental backups are small, so rows are
+    sent one statement at a time, which works the same on every database.
+    """
+    _, table_name, columns = next(entry for entry in RESTORE_TABLES if entry[0] == table)
+    keys = UPSERT_KEYS[table]
+    values = [column for column in columns if column not in keys]
+    update_sql = (f"UPDATE {table_name} SET {', '.join(column + ' = ?' for column in values)} "
+                  f"WHERE {' AND '.join(column + ' = ?' for column in keys)}")
+    insert_sql = f"INSERT INTO {table_name} ({', '.join(columns)}) VALUES ({', '.join('?' * len(columns))})"
+    inserted = updated = pending = 0
+    
+    for row in rows:
+        try:
+            params = dict(zip(columns, prepare(row)))
+        except (ValueError, KeyError, TypeError) as e:
+            rejects.write(table, row, e)
+            continue
+        try:
+            cursor.execute(update_sql, [params[column] for column in values + keys])
+            if cursor.rowcount == 0:
+                cursor.execute(insert_sql, [params[column] for column in columns])
+                inserted += 1
+            else:
+                updated += 1
+        except pyodbc.Error as e:
+            rejects.write(table, row, e)
+        pending += 1
+        if pending >= RESTORE_CHUNK_ROWS:
+            conn.commit()
+            pending = 0
+    conn.commit()
+    return inserted, updated
+
+def apply_incremental_tables(conn, tables, rejects):
+    """Apply an incremental backup (name -> iterable of row dicts) on top of restored data"""
+    cursor = conn.cursor()
+    event_ids = {}
+    
+    def prepare_for(table, columns):
+        def prepare(row):
+            if table == "attendance_records":
+                if row.get('EventName') not in event_ids:
+                    raise ValueError(f"event {row.get('EventName') or row.get('EventID')} not found")
+                row = dict(row, EventID=event_ids[row['EventName']])
+            return tuple(parse_backup_value(column, row.get(column)) for column in columns)
+        return prepare
+    
+    counts = {}
+    for table, table_name, columns in RESTORE_TABLES:
+        if table == "attendance_records":
+            cursor.execute("SELECT EventID, EventName FROM Events")
+            event_ids.update((row[1], row[0]) for row in cursor.fetchall())
+        inserted, updated = upsert_rows(conn, cursor, table, tables.get(table, []), prepare_for(table, columns), rejects)
+        counts[table] = inserted + updated
+        print(f"   {table_name}: {inserted} added, {updated} updated")
+    return counts
+
+def finish_restore(rejects):
+    """Close the reject file and report rows that were not restored"""
+    rejects.close()
+    if rejects.count:
+        print(f"⚠️  {rejects.count} rows could not be restored; see {rejects.path}")
+
+def rebuild_summary(conn):
+    """Recompute AttendanceDailySummary from the restored attendance rows in one transaction"""
+    cursor = conn.cursor()
+    try:
+        cursor.execute("DELETE FROM AttendanceDailySummary")
+        cursor.execute(REBUILD_SUMMARY_SQL)
+        rows = cursor.rowcount
+        conn.commit()
+    except pyodbc.Error as e:
+        conn.rollback()
+        print(f"⚠️  Attendance summary not rebuilt ({e}); run 'python db_tools.py rebuild-summary'")
+        return
+    print(f"📊 Attendance summary rebuilt: {rows} event/date/section rows")
+
+def restore_database_data(connection_string, workers=RESTORE_WORKERS):
     """Restore data from JSON files"""
     try:
         if not os.path.exists('database_backup.json'):
             print("❌ database_backup.json not found!")
             return False
         
-        # Convert SQLAlchemy URL to pyodbc connection string
-        if "mssql+pyodbc://" in connection_string:
-            parts = connection_string.replace("mssql+pyodbc://", "").split("/")
-            auth_server = parts[0]
-            database = parts[1].split("?")[0]
-            
-            if "@" in auth_server:
-                auth, server = auth_server.split("@")
-                username, password = auth.split(":")
-                conn_str = f"DRIVER={{ODBC Driver 17 for SQL Server}};SERVER={server};DATABASE={database};UID={username};PWD={password}"
-            else:
-                conn_str = f"DRIVER={{ODBC Driver 17 for SQL Server}};SERVER={auth_server};DATABASE={database};Trusted_Connection=yes"
-        else:
-            conn_str = connection_string
-        
-        conn = pyodbc.connect(conn_str)
-        cursor = conn.cursor()
+        conn = pyodbc.connect(get_pyodbc_connection_string(connection_string))
         
         print("📊 Restoring database data...")
         
@@ -146,84 +664,94 @@ def restore_database_data(connection_string):
         
         print(f"📅 Backup date: {backup_data.get('backup_date', 'Unknown')}")
         
-        # Clear existing data (optional - comment out if you want to keep existing data)
-        print("🗑️  Clearing existing data...")
-        cursor.execute("DELETE FROM AttendanceRecords")
-        cursor.execute("DELETE FROM Students")
-        cursor.execute("DELETE FROM Events")
-        cursor.execute("DELETE FROM Users")
+        rejects = RejectWriter(REJECT_FILE)
+        try:
+            counts = restore_tables(conn, backup_data, rejects, workers=workers,
+                                    connect=lambda: pyodbc.connect(get_pyodbc_connection_string(connection_string)))
+        finally:
+            finish_restore(rejects)
+        rebuild_summary(conn)
+        conn.close()
         
-        # Restore users first (due to foreign key constraints)
-        users = backup_data.get('users', [])
-        for user in users:
-            try:
-                cursor.execute("""
-                    INSERT INTO Users (Username, PasswordHash, FullName, Role, CreatedAt, UpdatedAt, IsActive)
-                    VALUES (?, ?, ?, ?, ?, ?, ?)
-                """, user['Username'], user['PasswordHash'], user['FullName'], 
-                      user['Role'], user['CreatedAt'], user['UpdatedAt'], user['IsActive'])
-            except Exception as e:
-                print(f"⚠️  User {user['Username']} already exists, skipping...")
-        
-        # Restore students
-        students = backup_data.get('students', [])
-        for student in students:
-            try:
-                cursor.execute("""
-                    INSERT INTO Students (StudentID, StudentName, Section, CreatedAt, UpdatedAt, IsActive)
-                    VALUES (?, ?, ?, ?, ?, ?)
-                """, student['StudentID'], student['StudentName'], student['Section'],
-                      student['CreatedAt'], student['UpdatedAt'], student['IsActive'])
-            except Exception as e:
-                print(f"⚠️  Student {student['StudentID']} already exists, skipping...")
-        
-        # Restore events
-        events = backup_data.get('events', [])
-        for event in events:
-            try:
-                cursor.execute("""
-                    INSERT INTO Events (EventName, EventDescription, CreatedAt, UpdatedAt, IsActive)
-                    VALUES (?, ?, ?, ?, ?)
-                """, event['EventName'], event['EventDescription'],
-                      event['CreatedAt'], event['UpdatedAt'], event['IsActive'])
-            except Exception as e:
-                print(f"⚠️  Event {event['EventName']} already exists, skipping...")
-        
-        # Get event ID mapping for attendance records
-        cursor.execute("SELECT EventID, EventName FROM Events")
-        event_mapping = {row[1]: row[0] for row in cursor.fetchall()}
-        
-        # Restore attendance records
-        attendance = backup_data.get('attendance_records', [])
-        for record in attendance:
-            try:
-                # Get current event ID
-                cursor.execute("SELECT EventID FROM Events WHERE EventName = ?", record['EventName'])
-                event_row = cursor.fetchone()
-                if event_row:
-                    event_id = event_row[0]
-                else:
-                    print(f"⚠️  Event {record['EventName']} not found, skipping attendance record...")
-                    continue
-                
-                cursor.execute("""
-                    INSERT INTO AttendanceRecords (StudentID, EventID, AttendanceDate, TimeIn, TimeOut, CheckInMs, LastUpdateMs, CreatedAt, UpdatedAt)
-                    VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)
-                """, record['StudentID'], event_id, record['AttendanceDate'],
-                      record['TimeIn'], record['TimeOut'], record['CheckInMs'], 
-                      record['LastUpdateMs'], record['CreatedAt'], record['UpdatedAt'])
-            except Exception as e:
-                print(f"⚠️  Attendance record for {record['StudentID']} already exists, skipping...")
+        print("✅ Database restore completed!")
+        print(f"   👥 Students: {counts['students']}")
+        print(f"   📅 Events: {counts['events']}")
+        print(f"   📊 Attendance Records: {counts['attendance_records']}")
+        print(f"   👤 Users: {counts['users']}")
         
-        conn.commit()
+        return True
+        
+    except Exception as e:
+        print(f"❌ Restore failed: {e}")
+        return False
+
+def restore_database_ndjson(connection_string, backup_dir=BACKUP_DIR, workers=RESTORE_WORKERS, delta_dirs=()):
+    """Restore a streaming NDJSON backup folder, then any incremental backups taken after it, in order.
+    
+    Every folder is checked against its manifest, and each incremental
+    backup against the one before it, before anything is changed.
+    """
+    try:
+        chain = []
+        for folder in [backup_dir, *delta_dirs]:
+            manifest = load_manifest(folder)
+            if manifest is None:
+                print(f"❌ {os.path.join(folder, MANIFEST_FILE)} not found! (an interrupted backup has no manifest)")
+                return False
+            chain.append((folder, manifest))
+        
+        if chain[0][1].get('type', 'full') != 'full':
+            print(f"❌ {backup_dir} is an incremental backup; start from a full backup")
+            return False
+        for (_, previous), (folder, manifest) in zip(chain, chain[1:]):
+            if manifest.get('type') != 'incremental' or manifest.get('base_backup_date') != previous['backup_date']:
+                print(f"❌ {folder} was not taken from the backup before it "
+                      f"(expected an incremental backup of {previous['backup_date']})")
+                return False
+        
+        print(f"📅 Backup date: {chain[-1][1].get('backup_date', 'Unknown')}"
+              + (f" ({len(delta_dirs)} incremental backup(s))" if delta_dirs else ""))
+        print("🔍 Verifying backup files...")
+        problems = [f"{folder}: {problem}" if delta_dirs else problem
+                    for folder, manifest in chain for problem in verify_backup(folder, manifest)]
+        if problems:
+            for problem in problems:
+                print(f"   ❌ {problem}")
+            print("❌ Backup is incomplete or corrupted; nothing was changed")
+            return False
+        
+        def backup_tables(folder, manifest):
+            return {
+                table: read_backup_table(os.path.join(folder, manifest['tables'][table]['file']))
+                for table, _, _ in RESTORE_TABLES
+            }
+        
+        conn = pyodbc.connect(get_pyodbc_connection_string(connection_string))
+        
+        print("📊 Restoring database data...")
+        rejects = RejectWriter(REJECT_FILE)
+        try:
+            counts = restore_tables(conn, backup_tables(*chain[0]), rejects, workers=workers,
+                                    connect=lambda: pyodbc.connect(get_pyodbc_connection_string(connection_string)))
+            for folder, manifest in chain[1:]:
+                print(f"📥 Applying {folder} ({manifest['backup_date']})...")
+                apply_incremental_tables(conn, backup_tables(folder, manifest), rejects)
+        finally:
+            finish_restore(rejects)
+        rebuild_summary(conn)
+        
+        if delta_dirs:
+            cursor = conn.cursor()
+            for table, table_name, _ in RESTORE_TABLES:
+                cursor.execute(f"SELECT COUNT(*) FROM {table_name}")
+                counts[table] = cursor.fetchone()[0]
         conn.close()
         
         print("✅ Database restore completed!")
-        print(f"   👥 Students: {len(students)}")
-        print(f"   📅 Events: {len(events)}")
-        print(f"   📊 Attendance Records: {len(attendance)}")
-        print(f"   👤 Users: {len(users)}")
-        
+        print(f"   👥 Students: {counts['students']}")
+        print(f"   📅 Events: {counts['events']}")
+        print(f"   📊 Attendance Records: {counts['attendance_records']}")
+        print(f"   👤 Users: {counts['users']}")
         return True
         
     except Exception as e:
@@ -233,21 +761,7 @@ def restore_database_data(connection_string):
 def test_connection(connection_string):
     """Test database connection"""
     try:
-        if "mssql+pyodbc://" in connection_string:
-            parts = connection_string.replace("mssql+pyodbc://", "").split("/")
-            auth_server = parts[0]
-            database = parts[1].split("?")[0]
-            
-            if "@" in auth_server:
-                auth, server = auth_server.split("@")
-                username, password = auth.split(":")
-                conn_str = f"DRIVER={{ODBC Driver 17 for SQL Server}};SERVER={server};DATABASE={database};UID={username};PWD={password}"
-            else:
-                conn_str = f"DRIVER={{ODBC Driver 17 for SQL Server}};SERVER={auth_server};DATABASE={database};Trusted_Connection=yes"
-        else:
-            conn_str = connection_string
-        
-        conn = pyodbc.connect(conn_str)
+        conn = pyodbc.connect(get_pyodbc_connection_string(connection_string))
         cursor = conn.cursor()
         cursor.execute("SELECT COUNT(*) FROM Students")
         count = cursor.fetchone()[0]
@@ -260,8 +774,65 @@ def test_connection(connection_string):
         print(f"❌ Connection failed: {e}")
         return False
 
+def run_command(args):
+    """Non-interactive entry point (python migration_helper.py <command> ...)"""
+    connection_string = args.database_url or os.getenv("DATABASE_URL")
+    if not connection_string:
+        print("❌ No connection string provided! Set DATABASE_URL or pass --database-url")
+        return 1
+    
+    if args.command == "test":
+        return 0 if test_connection(connection_string) else 1
+    if args.command == "backup":
+        if args.format == "json" and args.since:
+            print("❌ Incremental backups need --format ndjson")
+            return 1
+        if args.format == "json":
+            return 0 if backup_database_data(connection_string) else 1
+        output = args.output or (f"{BACKUP_DIR}_incremental_{datetime.now():%Y%m%d_%H%M%S}" if args.since else BACKUP_DIR)
+        return 0 if backup_database_ndjson(connection_string, output, args.compression, args.workers, args.since) else 1
+    if args.command == "restore":
+        if args.format == "json" and args.incremental:
+            print("❌ Incremental backups need --format ndjson")
+            return 1
+        if args.format == "json":
+            return 0 if restore_database_data(connection_string, args.workers) else 1
+        return 0 if restore_database_ndjson(connection_string, args.input, args.workers, args.incremental) else 1
+    return 1
+
+def build_parser():
+    parser = argparse.ArgumentParser(description="QR Attendance System - Database Migration Helper")
+    parser.add_argument("--database-url", help="SQLAlchemy URL or ODBC connection string (default: DATABASE_URL)")
+    subparsers = parser.add_subparsers(dest="command")
+    
+    subparsers.add_parser("test", help="Test the database connection")
+    
+    backup = subparsers.add_parser("backup", help="Back up all tables")
+    backup.add_argument("--format", choices=["ndjson", "json"], default="ndjson",
+                        help="ndjson: streamed, compressed, one file per table (default); json: single database_backup.json")
+    backup.add_argument("--compression", choices=["gzip", "zstd"], default="gzip")
+    backup.add_argument("--output", help=f"backup folder for ndjson backups (default: {BACKUP_DIR}, "
+                                         f"or {BACKUP_DIR}_incremental_<timestamp> with --since)")
+    backup.add_argument("--since", metavar="BACKUP_FOLDER",
+                        help="incremental backup: only rows changed since this earlier ndjson backup (full or incremental)")
+    backup.add_argument("--workers", type=int, default=BACKUP_WORKERS,
+                        help=f"tables exported at once, one connection each (ndjson only; default: BACKUP_WORKERS={BACKUP_WORKERS})")
+    
+    restore = subparsers.add_parser("restore", help="Replace all data with a backup")
+    restore.add_argument("--format", choices=["ndjson", "json"], default="ndjson",
+                         help="ndjson: backup folder with manifest.json (default); json: database_backup.json")
+    restore.add_argument("--input", default=BACKUP_DIR, help=f"backup folder for ndjson backups (default: {BACKUP_DIR})")
+    restore.add_argument("--incremental", nargs="+", default=[], metavar="BACKUP_FOLDER",
+                         help="incremental backups to apply after --input, oldest first (ndjson only)")
+    restore.add_argument("--workers", type=int, default=RESTORE_WORKERS,
+                         help=f"tables inserted at once, one connection each (default: RESTORE_WORKERS={RESTORE_WORKERS})")
+    return parser
+
 def main():
     """Main migration helper"""
+    if len(sys.argv) > 1:
+        return run_command(build_parser().parse_args())
+    
     print("QR Attendance System - Database Migration Helper")
     print("=" * 55)
     print()
@@ -288,8 +859,10 @@ def main():
     print("1. Backup database to JSON file")
     print("2. Restore database from JSON file")
     print("3. Test connection only")
+    print(f"4. Backup database to compressed NDJSON files ({BACKUP_DIR}/, for large databases)")
+    print(f"5. Restore database from compressed NDJSON files ({BACKUP_DIR}/)")
     
-    choice = input("Enter your choice (1-3): ").strip()
+    choice = input("Enter your choice (1-5): ").strip()
     
     if choice == "1":
         print("\n📤 Starting backup...")
@@ -309,8 +882,23 @@ def main():
     elif choice == "3":
         print("\n✅ Connection test completed!")
     
+    elif choice == "4":
+        print("\n📤 Starting backup...")
+        if backup_database_ndjson(connection_string):
+            print("\n✅ Backup completed successfully!")
+            print(f"📁 Copy the '{BACKUP_DIR}' folder to your new PC")
+        else:
+            print("\n❌ Backup failed!")
+    
+    elif choice == "5":
+        print("\n📥 Starting restore...")
+        if restore_database_ndjson(connection_string):
+            print("\n✅ Restore completed successfully!")
+        else:
+            print("\n❌ Restore failed!")
+    
     else:
         print("❌ Invalid choice!")
 
 if __name__ == "__main__":
-    main()
+    sys.exit(main())
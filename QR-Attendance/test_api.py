@@ -141,6 +141,29 @@ def test_mark_attendance():
         print(f"✗ Attendance marking error: {e}")
         return False
 
+def test_mark_attendance_batch():
+    """Test replaying a batch of queued scans"""
+    print("\nTesting batch attendance marking...")
+    try:
+        batch_data = [
+            {"student_id": "TEST001", "event_name": "Test Event", "time_in": datetime.utcnow().isoformat() + "Z"},
+            {"student_id": "UNKNOWN999", "event_name": "Test Event"}
+        ]
+        headers = {"Authorization": f"Bearer {API_KEY}"}
+        response = requests.post(f"{BASE_URL}/attendance/mark/batch", json=batch_data, headers=headers)
+        if response.status_code == 200:
+            data = response.json()
+            print("✓ Batch processed successfully")
+            print(f"  Succeeded: {data['succeeded']}, Failed: {data['failed']}")
+            return data['succeeded'] == 1 and data['failed'] == 1
+        else:
+            print(f"✗ Batch marking failed: {response.status_code}")
+            print(f"  Response: {response.text}")
+            return False
+    except Exception as e:
+        print(f"✗ Batch marking error: {e}")
+        return False
+
 def test_get_attendance():
     """Test getting attendance records"""
     print("\nTesting get attendance...")
@@ -203,6 +226,7 @@ def main():
         ("Get Students", test_get_students),
         ("Create Event", test_create_event),
         ("Mark Attendance", test_mark_attendance),
+        ("Mark Attendance Batch", test_mark_attendance_batch),
         ("Get Attendance", test_get_attendance),
         ("Timeout Attendance", test_timeout_attendance),
     ]
@@ -0,0 +1,63 @@
+# QR Attendance System - Test Fixtures
+# Runs the API in-process against a throwaway SQLite database (no server or SQL Server needed)
+
+import os
+import sys
+import tempfile
+
+import pytest
+
+# DATABASE_URL and the other settings are read when backend.main is imported
+TEST_DIR = tempfile.mkdtemp(prefix="qr_tests_")
+os.environ["DATABASE_URL"] = f"sqlite:///{os.path.join(TEST_DIR, 'test.db')}"
+os.environ["SCHEMA_AUTO_MIGRATE"] = "True"
+os.environ["SCAN_QUEUE_ENABLED"] = "True"
+os.environ["SCAN_QUEUE_FLUSH_INTERVAL_MS"] = "10"
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import backend.main as backend
+from fastapi.testclient import TestClient
+
+@pytest.fixture(autouse=True)
+def clean_database():
+    """Empty every table (the schema version stays) and the in-process caches"""
+    backend.migrate_schema(backend.engine)
+    with backend.engine.begin() as connection:
+        for table in reversed(backend.Base.metadata.sorted_tables):
+            if table is not backend.SchemaVersion.__table__:
+                connection.execute(table.delete())
+    backend.roster_cache.clear()
+    backend.api_key_cache.clear()
+    backend.stream_token_cache.clear()
+    yield
+
+@pytest.fixture
+def client(tmp_path, monkeypatch):
+    # A fresh scan queue journal per test
+    monkeypatch.setattr(backend, "SCAN_QUEUE_PATH", str(tmp_path / "scan_queue.db"))
+    with TestClient(backend.app) as client:
+        yield client
+
+@pytest.fixture
+def headers(client):
+    """Authorization header of a freshly registered admin"""
+    client.post("/auth/register", json={"username": "admin", "password": "admin123", "full_name": "Test Admin"})
+    response = client.post("/auth/login", json={"username": "admin", "password": "admin123"})
+    return {"Authorization": f"Bearer {response.json()['access_token']}"}
+
+@pytest.fixture
+def students(client, headers):
+    """Five students in two sections"""
+    ids = [f"S{number:03d}" for number in range(5)]
+    for number, student_id in enumerate(ids):
+        response = client.post("/students", headers=headers, json={
+            "StudentID": student_id, "StudentName": f"Student {number}", "Section": f"Section {number % 2}"
+        })
+        assert response.status_code == 200
+    return ids
+
+@pytest.fixture
+def db_session():
+    session = backend.SessionLocal()
+    yield session
+    session.close()
@@ -0,0 +1,171 @@
+# QR Attendance System - Attendance write path tests
+
+import calendar
+import time
+from datetime import date, datetime, timedelta
+
+from conftest import backend
+
+def mark(client, headers, student_id, event_name="Orientation", **fields):
+    response = client.post("/attendance/mark", headers=headers, json={"student_id": student_id, "event_name": event_name, **fields})
+    assert response.status_code == 200, response.text
+    return response.json()
+
+def wait_for_queue(client, headers, timeout: float = 5.0):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        if client.get("/attendance/queue", headers=headers).json()["depth"] == 0:
+            return
+        time.sleep(0.02)
+    raise AssertionError("scan queue did not drain")
+
+def test_mark_checks_in_then_out(client, headers, students):
+    time_in = datetime(2024, 3, 1, 8, 0)
+    record = mark(client, headers, students[0], attendance_date="2024-03-01", time_in=time_in.isoformat())
+    assert record["TimeIn"] == time_in.isoformat()
+    assert record["TimeOut"] is None
+
+    record = mark(client, headers, students[0], attendance_date="2024-03-01", time_out=(time_in + timedelta(minutes=90)).isoformat())
+    assert record["TimeIn"] == time_in.isoformat()
+    assert record["DurationMinutes"] == 90
+
+def test_mark_unknown_student(client, headers, students):
+    response = client.post("/attendance/mark", headers=headers, json={"student_id": "nobody", "event_name": "Orientation"})
+    assert response.status_code == 404
+
+def test_mark_converts_offsets_to_utc(client, headers, students):
+    record = mark(client, headers, students[0], attendance_date="2024-03-01", time_in="2024-03-01T10:00:00+02:00")
+    assert record["TimeIn"] == "2024-03-01T08:00:00"
+
+def test_batch_reports_each_item(client, headers, students):
+    items = [{"student_id": student_id, "event_name": "Orientation", "attendance_date": "2024-03-01"} for student_id in students]
+    items.append({"student_id": "nobody", "event_name": "Orientation"})
+    response = client.post("/attendance/mark/batch", headers=headers, json=items)
+    assert response.status_code == 200
+    body = response.json()
+    assert (body["processed"], body["succeeded"], body["failed"]) == (6, 5, 1)
+    assert body["results"][-1]["status"] != "ok"
+    assert [result["index"] for result in body["results"]] == list(range(6))
+
+def test_batch_too_large(client, headers, students, monkeypatch):
+    monkeypatch.setattr(backend, "ATTENDANCE_BATCH_MAX_SIZE", 2)
+    items = [{"student_id": student_id, "event_name": "Orientation"} for student_id in students]
+    assert client.post("/attendance/mark/batch", headers=headers, json=items).status_code == 413
+
+def test_queued_scans_are_flushed(client, headers, students):
+    for student_id in students:
+        response = client.post("/attendance/mark/queued", headers=headers, json={"student_id": student_id, "event_name": "Orientation"})
+        assert response.status_code == 202
+    wait_for_queue(client, headers)
+
+    records = client.get("/attendance/event/Orientation", headers=headers).json()
+    assert sorted(record["StudentID"] for record in records) == students
+    assert all(record["TimeIn"] for record in records)
+
+def test_summary_matches_records(client, headers, students, db_session):
+    for student_id in students:
+        mark(client, headers, student_id, attendance_date="2024-03-01", time_in="2024-03-01T08:00:00")
+    mark(client, headers, students[0], attendance_date="2024-03-01", time_out="2024-03-01T09:00:00")
+
+    summary = client.get("/attendance/summary", headers=headers).json()
+    by_section = {row["Section"]: row for row in summary}
+    assert by_section["Section 0"]["CheckedIn"] == 3
+    assert by_section["Section 0"]["CheckedOut"] == 1
+    assert by_section["Section 0"]["StillInside"] == 2
+    assert by_section["Section 0"]["AverageDurationMinutes"] == 60
+    assert by_section["Section 1"]["CheckedIn"] == 2
+    assert backend.check_attendance_summary(db_session) == []
+
+def test_batch_and_single_paths_agree(client, headers, students):
+    # A time-out scan first (new row, TimeIn defaults to the scan time), then a
+    # check-in and a scan carrying both times on the existing row
+    scans = [
+        {"time_out": "2024-03-01T09:30:00"},
+        {"time_in": "2024-03-01T08:00:00"},
+        {"time_in": "2024-03-01T08:30:00", "time_out": "2024-03-01T09:00:00"},
+    ]
+    for scan in scans:
+        single = mark(client, headers, students[0], event_name="Single", attendance_date="2024-03-01", **scan)
+        batch = client.post("/attendance/mark/batch", headers=headers, json=[
+            {"student_id": students[1], "event_name": "Batch", "attendance_date": "2024-03-01", **scan}
+        ]).json()["results"][0]["record"]
+        if scan is scans[0]:
+            assert single["TimeIn"] is not None and batch["TimeIn"] is not None
+            assert batch["TimeOut"] == single["TimeOut"] == scan["time_out"]
+        else:
+            assert (batch["TimeIn"], batch["TimeOut"], batch["DurationMinutes"]) == (single["TimeIn"], single["TimeOut"], single["DurationMinutes"])
+    assert (single["TimeIn"], single["TimeOut"], single["DurationMinutes"]) == ("2024-03-01T08:00:00", "2024-03-01T09:00:00", 60)
+
+def test_time_out_scan_creates_row_with_time_in(client, headers, students):
+    response = client.post("/attendance/mark/batch", headers=headers, json=[
+        {"student_id": students[0], "event_name": "Orientation", "time_out": datetime.utcnow().isoformat()}
+    ])
+    record = response.json()["results"][0]["record"]
+    assert record["TimeIn"] is not None
+    assert record["TimeOut"] is not None
+
+def test_batch_isolates_database_errors(client, headers, students, db_session):
+    # A deactivated event's name cannot be reused, so that scan's event insert fails
+    db_session.add(backend.Event(EventName="Cancelled", IsActive=False))
+    db_session.commit()
+
+    response = client.post("/attendance/mark/batch", headers=headers, json=[
+        {"student_id": students[0], "event_name": "Orientation"},
+        {"student_id": students[1], "event_name": "Cancelled"},
+        {"student_id": students[2], "event_name": "Open House"},
+    ])
+    assert response.status_code == 200
+    assert [result["status"] for result in response.json()["results"]] == ["ok", "error", "ok"]
+
+    assert [record["StudentID"] for record in client.get("/attendance/event/Orientation", headers=headers).json()] == [students[0]]
+    assert [record["StudentID"] for record in client.get("/attendance/event/Open House", headers=headers).json()] == [students[2]]
+    assert backend.check_attendance_summary(db_session) == []
+
+def test_queued_time_out_scan_creates_row_with_time_in(client, headers, students):
+    response = client.post("/attendance/mark/queued", headers=headers, json={
+        "student_id": students[0], "event_name": "Orientation", "time_out": datetime.utcnow().isoformat()
+    })
+    assert response.status_code == 202
+    wait_for_queue(client, headers)
+
+    [record] = client.get("/attendance/event/Orientation", headers=headers).json()
+    assert record["TimeIn"] is not None
+    assert record["TimeIn"] <= record["TimeOut"]
+
+def test_queued_bad_scan_does_not_block_the_group(client, headers, students, db_session, monkeypatch):
+    db_session.add(backend.Event(EventName="Cancelled", IsActive=False))
+    db_session.commit()
+
+    # Hold the flusher so all three scans land in one flush group
+    monkeypatch.setattr(backend.scan_queue_flusher, "interval_seconds", 0.5)
+    for student_id, event_name in ((students[0], "Orientation"), (students[1], "Cancelled"), (students[2], "Orientation")):
+        response = client.post("/attendance/mark/queued", headers=headers, json={"student_id": student_id, "event_name": event_name})
+        assert response.status_code == 202
+    wait_for_queue(client, headers)
+
+    records = client.get("/attendance/event/Orientation", headers=headers).json()
+    assert sorted(record["StudentID"] for record in records) == [students[0], students[2]]
+    stats = client.get("/attendance/queue", headers=headers).json()
+    assert (stats["flushed"], stats["failed"]) == (2, 1)
+    assert backend.check_attendance_summary(db_session) == []
+
+def test_queue_flush_metrics(client, headers, students):
+    client.post("/attendance/mark/queued", headers=headers, json={"student_id": students[0], "event_name": "Orientation"})
+    wait_for_queue(client, headers)
+
+    metrics = client.get("/metrics").text
+    for name in ("qr_scan_queue_last_flush_seconds", "qr_scan_queue_avg_flush_seconds", "qr_scan_queue_max_flush_seconds"):
+        assert f"# TYPE {name} gauge" in metrics
+
+def test_last_update_ms_is_utc(client, headers, students, db_session, monkeypatch):
+    # UpdatedAt and LastUpdateMs are both backup watermarks, so they must agree whatever the server's zone
+    monkeypatch.setenv("TZ", "Asia/Manila")
+    time.tzset()
+    try:
+        mark(client, headers, students[0])
+    finally:
+        monkeypatch.undo()
+        time.tzset()
+
+    record = db_session.query(backend.AttendanceRecord).one()
+    assert abs(record.LastUpdateMs - calendar.timegm(record.UpdatedAt.utctimetuple()) * 1000) < 1000
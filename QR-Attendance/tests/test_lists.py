@@ -0,0 +1,103 @@
+# QR Attendance System - List, conditional GET and export tests
+
+import csv
+import io
+import json
+from zoneinfo import ZoneInfo
+
+from openpyxl import load_workbook
+
+from conftest import backend
+
+def mark_all(client, headers, students, event_name="Orientation"):
+    items = [{"student_id": student_id, "event_name": event_name, "attendance_date": "2024-03-01", "time_in": "2024-03-01T08:00:00"} for student_id in students]
+    assert client.post("/attendance/mark/batch", headers=headers, json=items).json()["succeeded"] == len(students)
+
+def test_students_paginate(client, headers, students):
+    seen = []
+    params = {"limit": 2}
+    while True:
+        response = client.get("/students", headers=headers, params=params)
+        assert response.status_code == 200
+        seen += [student["StudentID"] for student in response.json()]
+        if "X-Next-Cursor" not in response.headers:
+            break
+        params["after"] = response.headers["X-Next-Cursor"]
+    assert seen == students
+
+def test_event_attendance_paginates(client, headers, students):
+    mark_all(client, headers, students)
+    seen = []
+    params = {"limit": 2}
+    while True:
+        response = client.get("/attendance/event/Orientation", headers=headers, params=params)
+        seen += [record["RecordID"] for record in response.json()]
+        if "X-Next-Cursor" not in response.headers:
+            break
+        params["after"] = response.headers["X-Next-Cursor"]
+    assert len(seen) == len(set(seen)) == len(students)
+
+def test_invalid_cursor(client, headers, students):
+    assert client.get("/students", headers=headers, params={"after": "not-a-cursor"}).status_code == 400
+    assert client.get("/attendance/student/S000", headers=headers, params={"after": "WyJ4Il0"}).status_code == 400
+
+def test_etag_not_modified(client, headers, students):
+    response = client.get("/students", headers=headers)
+    etag = response.headers["ETag"]
+    response = client.get("/students", headers={**headers, "If-None-Match": etag})
+    assert response.status_code == 304
+    assert response.headers["ETag"] == etag
+
+    client.post("/students", headers=headers, json={"StudentID": "S999", "StudentName": "Late Enrollee", "Section": "Section 0"})
+    assert client.get("/students", headers={**headers, "If-None-Match": etag}).status_code == 200
+
+def test_export_ndjson_and_csv(client, headers, students):
+    mark_all(client, headers, students)
+
+    response = client.get("/attendance/export", headers=headers)
+    assert response.status_code == 200
+    rows = [json.loads(line) for line in response.text.splitlines()]
+    assert [row["StudentID"] for row in rows] == students
+
+    response = client.get("/attendance/export", headers=headers, params={"format": "csv", "section": "Section 1"})
+    assert response.headers["content-type"].startswith("text/csv")
+    rows = list(csv.DictReader(io.StringIO(response.text)))
+    assert [row["StudentID"] for row in rows] == ["S001", "S003"]
+
+def test_xlsx_report(client, headers, students):
+    mark_all(client, headers, students)
+    response = client.get("/attendance/report.xlsx", headers=headers, params={"event_name": "Orientation"})
+    assert response.status_code == 200
+
+    workbook = load_workbook(io.BytesIO(response.content))
+    records = list(workbook["Attendance Records"].values)
+    assert records[0] == ("#", "Student#", "Name", "Section", "Date", "Time-in", "Time-out")
+    assert [row[1] for row in records[1:]] == students
+    assert records[1][4] == "3/1/2024"
+
+    sections = list(workbook["Students by Section"].values)
+    assert sections[1][0] == "Section 0"
+
+def test_deactivation_changes_etag(client, headers, students, db_session):
+    response = client.get("/students", headers=headers)
+    etag = response.headers["ETag"]
+    assert "Last-Modified" not in response.headers
+
+    # Deactivating keeps every remaining row's UpdatedAt; only the count changes
+    db_session.query(backend.Student).filter(backend.Student.StudentID == students[0]).update({backend.Student.IsActive: False})
+    db_session.commit()
+    response = client.get("/students", headers={**headers, "If-None-Match": etag})
+    assert response.status_code == 200
+    assert [student["StudentID"] for student in response.json()] == students[1:]
+
+def test_if_modified_since_is_ignored(client, headers, students):
+    response = client.get("/students", headers={**headers, "If-Modified-Since": "Fri, 01 Jan 2100 00:00:00 GMT"})
+    assert response.status_code == 200
+
+def test_xlsx_report_uses_report_timezone(client, headers, students, monkeypatch):
+    monkeypatch.setattr(backend, "REPORT_TZ", ZoneInfo("Asia/Manila"))
+    mark_all(client, headers, students[:1])
+    response = client.get("/attendance/report.xlsx", headers=headers)
+
+    records = list(load_workbook(io.BytesIO(response.content))["Attendance Records"].values)
+    assert records[1][5] == "4:00:00 PM"
@@ -0,0 +1,84 @@
+# QR Attendance System - Schema migration tests
+
+from datetime import date, datetime
+
+import pytest
+from sqlalchemy import inspect, text
+from sqlalchemy.orm import Session
+
+from conftest import backend
+
+# AttendanceRecords as the API created it before schema versioning: no unique key
+UNVERSIONED_ATTENDANCE_TABLE = """
+CREATE TABLE AttendanceRecords (
+    RecordID INTEGER PRIMARY KEY AUTOINCREMENT,
+    StudentID VARCHAR(50) NOT NULL REFERENCES Students (StudentID),
+    EventID INTEGER NOT NULL REFERENCES Events (EventID),
+    AttendanceDate DATE NOT NULL,
+    TimeIn DATETIME,
+    TimeOut DATETIME,
+    CheckInMs BIGINT,
+    LastUpdateMs BIGINT,
+    CreatedAt DATETIME,
+    UpdatedAt DATETIME
+)
+"""
+
+@pytest.fixture
+def unversioned_engine(tmp_path):
+    engine = backend.create_db_engine(f"sqlite:///{tmp_path / 'unversioned.db'}")
+    backend.Base.metadata.create_all(engine, tables=[
+        backend.Student.__table__, backend.Event.__table__, backend.User.__table__, backend.APIKey.__table__
+    ])
+    with engine.begin() as connection:
+        connection.execute(text(UNVERSIONED_ATTENDANCE_TABLE))
+    with Session(engine) as session:
+        session.add_all([
+            backend.Student(StudentID="S1", StudentName="One", Section="A"),
+            backend.Student(StudentID="S2", StudentName="Two", Section="B"),
+            backend.Event(EventID=1, EventName="Orientation"),
+        ])
+        session.flush()
+        session.add_all([
+            backend.AttendanceRecord(StudentID="S1", EventID=1, AttendanceDate=date(2024, 3, 1),
+                                     TimeIn=datetime(2024, 3, 1, 8), TimeOut=datetime(2024, 3, 1, 9)),
+            backend.AttendanceRecord(StudentID="S2", EventID=1, AttendanceDate=date(2024, 3, 1),
+                                     TimeIn=datetime(2024, 3, 1, 8)),
+        ])
+        session.commit()
+    yield engine
+    engine.dispose()
+
+def test_migrate_unversioned_database(unversioned_engine):
+    assert backend.read_schema_version(unversioned_engine) is None
+    assert backend.migrate_schema(unversioned_engine) == (None, backend.SCHEMA_VERSION)
+    assert backend.read_schema_version(unversioned_engine) == backend.SCHEMA_VERSION
+
+    indexes = inspect(unversioned_engine).get_indexes("AttendanceRecords")
+    assert any(index["unique"] and index["column_names"] == ["StudentID", "EventID", "AttendanceDate"] for index in indexes)
+
+    with Session(unversioned_engine) as session:
+        assert session.query(backend.AttendanceDailySummary).count() == 2
+        assert backend.check_attendance_summary(session) == []
+
+        # The ON CONFLICT upsert needs the new key
+        student = backend.CachedStudent.from_model(session.get(backend.Student, "S2"))
+        event = backend.CachedEvent.from_model(session.get(backend.Event, 1))
+        scan = backend.AttendanceMark(student_id="S2", event_name="Orientation", attendance_date=date(2024, 3, 1),
+                                      time_out=datetime(2024, 3, 1, 10))
+        record = backend.upsert_attendance(session, scan, student, event)
+        session.commit()
+        assert (record.TimeIn, record.TimeOut) == (datetime(2024, 3, 1, 8), datetime(2024, 3, 1, 10))
+        assert backend.check_attendance_summary(session) == []
+
+def test_migrate_refuses_duplicate_attendance(unversioned_engine):
+    with unversioned_engine.begin() as connection:
+        connection.execute(text("INSERT INTO AttendanceRecords (StudentID, EventID, AttendanceDate) VALUES ('S1', 1, '2024-03-01')"))
+
+    with pytest.raises(RuntimeError, match="more than one row"):
+        backend.migrate_schema(unversioned_engine)
+    assert backend.read_schema_version(unversioned_engine) is None
+
+def test_check_schema_without_auto_migrate(unversioned_engine):
+    with pytest.raises(RuntimeError, match="db_tools.py migrate"):
+        backend.check_schema(unversioned_engine, auto_migrate=False)